@@ -0,0 +1,180 @@
+"""
+Precomputed analytics rollups in the `analytics_rollups` collection.
+
+One document per (kind, key), e.g. {"_id": "role|Data Scientist", "kind": "role",
+"key": "Data Scientist", "count": 42, "saves": 3}. Kinds:
+    role       jobs per Role                    (/api/job-distribution)
+    work_type  jobs and salary sums per Work Type (/api/average-salary)
+    location   jobs per location                (best cities on /insights)
+    company    jobs per Company                 (/api/top-companies)
+    skill      jobs requiring each skill        (/api/skill-demand, /api/top-skills)
+`saves` counts how many saved jobs fall under each role, company, location and skill.
+
+mongodb_JobImport.py and save_job/remove_job apply $inc deltas; reads are an
+indexed top-N query. Run this module with --rebuild to recompute everything from
+the jobs and users collections, or --verify to compare without replacing.
+"""
+import argparse
+from collections import Counter, defaultdict
+from pymongo import DESCENDING, MongoClient, UpdateOne
+from job_fields import clean_and_split_skills
+
+ROLLUP_FIELDS = {"role": "Role", "work_type": "Work Type", "location": "location", "company": "Company"}
+JOB_PROJECTION = {"Role": 1, "Work Type": 1, "location": 1, "Company": 1, "skills": 1,
+                  "salary_min": 1, "salary_max": 1}
+
+# Number of rollup documents written per bulk request
+WRITE_BATCH_SIZE = 1000
+
+
+def rollup_id(kind, key):
+    return f"{kind}|{key}"
+
+
+def job_keys(job):
+    """(kind, key) pairs a job contributes to."""
+    keys = [(kind, job.get(field)) for kind, field in ROLLUP_FIELDS.items()
+            if job.get(field) not in (None, "")]
+    keys.extend(("skill", skill) for skill in set(clean_and_split_skills(job.get("skills"))))
+    return keys
+
+
+def job_deltas(jobs, sign=1, deltas=None):
+    """Accumulate count (and salary) deltas for added (sign=1) or removed (sign=-1) jobs."""
+    deltas = deltas if deltas is not None else defaultdict(Counter)
+    for job in jobs:
+        for kind, key in job_keys(job):
+            deltas[(kind, key)]["count"] += sign
+        salary_min, salary_max = job.get("salary_min"), job.get("salary_max")
+        work_type = job.get("Work Type")
+        if work_type not in (None, "") and salary_min is not None and salary_max is not None:
+            deltas[("work_type", work_type)]["salary_sum"] += sign * (salary_min + salary_max) / 2
+            deltas[("work_type", work_type)]["salary_count"] += sign
+    return deltas
+
+
+def save_deltas(job, sign=1):
+    """Deltas for a user saving (sign=1) or unsaving (sign=-1) a job."""
+    deltas = defaultdict(Counter)
+    for kind, key in job_keys(job):
+        if kind != "work_type":
+            deltas[(kind, key)]["saves"] += sign
+    return deltas
+
+
+def apply_deltas(rollups_collection, deltas):
+    """Write accumulated deltas as upserted $inc updates."""
+    requests = [
+        UpdateOne({"_id": rollup_id(kind, key)},
+                  {"$inc": dict(fields), "$setOnInsert": {"kind": kind, "key": key}},
+                  upsert=True)
+        for (kind, key), fields in deltas.items() if any(fields.values())
+    ]
+    for start in range(0, len(requests), WRITE_BATCH_SIZE):
+        rollups_collection.bulk_write(requests[start:start + WRITE_BATCH_SIZE], ordered=False)
+
+
+def record_jobs_added(rollups_collection, jobs):
+    apply_deltas(rollups_collection, job_deltas(jobs))
+
+
+def record_save(rollups_collection, jobs_collection, job_id, sign=1):
+    """Update the save counters after save_job (sign=1) or remove_job (sign=-1)."""
+    job = jobs_collection.find_one({"Job Id": as_job_id(job_id)}, JOB_PROJECTION)
+    if job:
+        apply_deltas(rollups_collection, save_deltas(job, sign))
+
+
+def as_job_id(job_id):
+    """Saved job ids are strings; the jobs collection uses integer Job Ids."""
+    try:
+        return int(job_id)
+    except (TypeError, ValueError):
+        return job_id
+
+
+def ensure_indexes(rollups_collection):
+    rollups_collection.create_index([("kind", 1), ("count", DESCENDING)], name="rollup_kind_count_index")
+
+
+def top(rollups_collection, kind, limit=10, sort_field="count"):
+    """Top-N rollup documents of a kind (index-backed for sort_field='count')."""
+    return list(rollups_collection.find({"kind": kind, sort_field: {"$gt": 0}})
+                .sort(sort_field, DESCENDING).limit(limit))
+
+
+def compute_rollups(jobs_collection, users_collection):
+    """Recompute every rollup document from scratch."""
+    deltas = job_deltas(jobs_collection.find({}, JOB_PROJECTION))
+
+    saved_counts = Counter()
+    for user in users_collection.find({}, {"user_job_preferences.saved_jobs": 1}):
+        saved_counts.update(as_job_id(job_id) for job_id in user["user_job_preferences"].get("saved_jobs", []))
+    for job in jobs_collection.find({"Job Id": {"$in": list(saved_counts)}}, {"Job Id": 1, **JOB_PROJECTION}):
+        for key, fields in save_deltas(job, saved_counts[job["Job Id"]]).items():
+            deltas[key].update(fields)
+
+    return {
+        rollup_id(kind, key): {"_id": rollup_id(kind, key), "kind": kind, "key": key, **fields}
+        for (kind, key), fields in deltas.items()
+    }
+
+
+def verify(rollups_collection, expected):
+    """Compare stored rollups with freshly computed ones; returns a list of mismatch descriptions."""
+    mismatches = []
+    stored = {doc["_id"]: doc for doc in rollups_collection.find({})}
+    numeric_fields = ("count", "saves", "salary_sum", "salary_count")
+    for rollup, doc in expected.items():
+        current = stored.pop(rollup, {})
+        for field in numeric_fields:
+            if abs(current.get(field, 0) - doc.get(field, 0)) > 1e-6:
+                mismatches.append(f"{rollup}.{field}: stored {current.get(field, 0)}, expected {doc.get(field, 0)}")
+    for rollup, doc in stored.items():
+        if any(doc.get(field, 0) for field in numeric_fields):
+            mismatches.append(f"{rollup}: stored but not expected")
+    return mismatches
+
+
+def rebuild(db):
+    """Recompute the rollups into a temporary collection, report drift and swap it in."""
+    expected = compute_rollups(db['jobs'], db['users'])
+    mismatches = verify(db['analytics_rollups'], expected)
+    print(f"Found {len(mismatches)} mismatched rollups before rebuild.")
+    for mismatch in mismatches[:20]:
+        print(f"  {mismatch}")
+
+    staging = db['analytics_rollups_rebuild']
+    staging.drop()
+    documents = list(expected.values())
+    for start in range(0, len(documents), WRITE_BATCH_SIZE):
+        staging.insert_many(documents[start:start + WRITE_BATCH_SIZE])
+    # Creating the index also creates the staging collection, so an empty result (no jobs left)
+    # still replaces the old rollups
+    ensure_indexes(staging)
+    staging.rename('analytics_rollups', dropTarget=True)
+
+    remaining = verify(db['analytics_rollups'], expected)
+    print(f"Rebuilt {len(documents)} rollups; {len(remaining)} mismatches after rebuild.")
+    return remaining
+
+
+if __name__ == "__main__":
+    from config import ATLAS_URI, DB_NAME
+    from result_cache import bump_data_version
+
+    parser = argparse.ArgumentParser(description="Rebuild or verify the analytics rollups.")
+    parser.add_argument("--verify", action="store_true", help="Only compare stored rollups with recomputed ones")
+    args = parser.parse_args()
+
+    client = MongoClient(ATLAS_URI)
+    db = client[DB_NAME]
+    if args.verify:
+        mismatches = verify(db['analytics_rollups'], compute_rollups(db['jobs'], db['users']))
+        print(f"Found {len(mismatches)} mismatched rollups.")
+        for mismatch in mismatches[:20]:
+            print(f"  {mismatch}")
+    else:
+        rebuild(db)
+        bump_data_version(db, "analytics_rollups")
+    client.close()
@@ -1,48 +1,165 @@
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-import re
-from flask import Flask, render_template, request, redirect, url_for, session
-from flask import Flask, jsonify, render_template, request, redirect, url_for, session
-from neo4j import GraphDatabase
-from pymongo import MongoClient
-from py2neo import Graph
-import uuid
-from pyvis.network import Network
+from functools import wraps
 import os
+import threading
+import time
+from flask import Blueprint, Flask, jsonify, render_template, request, redirect, url_for, session
+from pymongo import DESCENDING
+from pymongo.errors import DuplicateKeyError
+import uuid
 import jsonpickle, pyvis
-from config import ATLAS_URI, DB_NAME, NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD
-
-app = Flask(__name__)
-app.secret_key = "secret"
-
-client = MongoClient(ATLAS_URI)
-db = client[DB_NAME]
-
-users_collection = db['users']
-jobs_collection = db['jobs']
-
-# Set up Neo4j connection
-neo4j_graph = Graph(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASSWORD))
-
-# Verify Databases connection
-def verify_connection():
+from connections import LazyHandle, check_health, close_connections, get_db, get_handle, get_neo4j
+from neo4j_schema import setup_neo4j_schema
+from user_similarity import refresh_user
+from result_cache import TTLCache, get_data_version
+from search_backends import SEARCH_PROJECTION, create_search_backend
+from search_cache import CachedSearch, SearchResultCache
+from suggest_index import Suggester
+from skill_scoring import RelevanceScorer
+from metrics import registry as metrics_registry
+from profile_cache import create_profile_cache
+from id_allocator import IdBlockAllocator
+from job_fields import standardize_role
+from pagination import decode_cursor, page_size, paginate
+import analytics_rollups
+import geo_search
+import graph_artifact
+import neo4j_outbox
+
+# Routes live on a blueprint so create_app() can build any number of app instances;
+# templates refer to endpoints as 'views.<name>'
+views = Blueprint("views", __name__)
+
+# Resolved on every use, so importing this module does not connect to anything
+db = LazyHandle(get_db)
+users_collection = LazyHandle(lambda: get_db()['users'])
+jobs_collection = LazyHandle(lambda: get_db()['jobs'])
+recommendations_collection = LazyHandle(lambda: get_db()['recommendations'])
+rollups_collection = LazyHandle(lambda: get_db()['analytics_rollups'])
+career_paths_collection = LazyHandle(lambda: get_db()['career_paths'])  # Precomputed by career_paths.py
+neo4j_graph = LazyHandle(get_neo4j)  # Shared Neo4jClient (see neo4j_client.py)
+
+# Threads per process running a page's independent database lookups concurrently
+PAGE_QUERY_WORKERS = 16
+
+# User IDs reserved per counter round trip (see id_allocator.py)
+USER_ID_BLOCK_SIZE = 50
+
+# Signup attempts when an allocated user ID turns out to be taken
+USER_ID_ATTEMPTS = 3
+
+# Jobs per page of each job list (the page render and the /api/jobs/* endpoints)
+SEARCH_PAGE_SIZE = 10
+RELEVANT_PAGE_SIZE = 20
+RECOMMENDED_PAGE_SIZE = 10
+SAVED_PAGE_SIZE = 30
+
+# Roles whose next steps are shown on the Insights page
+CAREER_PATH_ROLES = 3
+
+# Fields the job tables render; list queries read only these
+JOB_LIST_PROJECTION = SEARCH_PROJECTION
+
+# Shared cache for the analytics endpoints; importers invalidate it through the data-version stamp
+analytics_cache = TTLCache(version_source=lambda: get_data_version(db))
+metrics_registry.gauge("analytics_cache", analytics_cache.stats)
+
+# User documents by user_id; every write to a user document must invalidate its entry
+profile_cache = create_profile_cache()
+metrics_registry.gauge("profile_cache", profile_cache.stats)
+metrics_registry.gauge("neo4j_outbox", lambda: neo4j_outbox.outbox_status(db))
+
+# KD-tree over job coordinates, used by /api/jobs/near until the 2dsphere index exists
+job_point_index = geo_search.JobPointIndex(version_source=lambda: get_data_version(db))
+
+# Full-text job search: MongoDB $text or the in-process BM25 index (SEARCH_BACKEND in config.py),
+# with results cached per normalised query until the next import
+search_backend = CachedSearch(
+    create_search_backend(jobs_collection, version_source=lambda: get_data_version(db)),
+    SearchResultCache(version_source=lambda: get_data_version(db))
+)
+metrics_registry.gauge("search", search_backend.stats)
+
+# Typeahead suggestions for the search box, built in memory from the jobs collection
+suggester = Suggester(jobs_collection, version_source=lambda: get_data_version(db))
+metrics_registry.gauge("suggest", suggester.stats)
+
+# "Relevant Jobs": every job scored against the user's skills and preferences in one sparse matrix product
+relevance_scorer = RelevanceScorer(jobs_collection, version_source=lambda: get_data_version(db))
+metrics_registry.gauge("relevance", relevance_scorer.stats)
+
+
+def create_app():
+    """Application factory. Connections are opened on first use, not here."""
+    app = Flask(__name__)
+    app.secret_key = "secret"
+    app.register_blueprint(views)
+    app.before_request(start_background_jobs)
+    app.cli.command("setup-db", help="Create the MongoDB indexes and Neo4j schema.")(setup)
+    return app
+
+
+background_jobs_pid = None
+background_jobs_lock = threading.Lock()
+
+
+def start_background_jobs():
+    """Start the graph artifact refresher, outbox flusher and index builds once per process, on its first request."""
+    global background_jobs_pid
+    if background_jobs_pid == os.getpid():
+        return
+    with background_jobs_lock:
+        if background_jobs_pid == os.getpid():
+            return
+        background_jobs_pid = os.getpid()
+    # Interactive graph on the Insights page: regenerated in the background when the graph changes
+    graph_artifact.start_background_refresh(neo4j_graph, extra_version=lambda: get_data_version(db))
+    # SAVED edges recorded by save_job/remove_job are written to Neo4j behind the request
+    neo4j_outbox.OutboxFlusher(db, neo4j_graph).start()
+    # Build the suggestion index, skill matrix and search index before the first keystroke or page view needs them
+    threading.Thread(target=warm_index, args=("suggestion index", suggester.ensure_index),
+                     name="suggest-index", daemon=True).start()
+    threading.Thread(target=warm_index, args=("skill matrix", relevance_scorer.ensure_matrix),
+                     name="skill-matrix", daemon=True).start()
+    threading.Thread(target=warm_index, args=("search index", search_backend.warm),
+                     name="search-index", daemon=True).start()
+
+
+def warm_index(description, ensure):
     try:
-        db.list_collection_names()
-        print("\n------ Connected to MongoDB Atlas successfully ------\n")
+        ensure()
     except Exception as e:
-        print(f"\n------ Failed to connect to MongoDB: {e} ------\n")
-        raise e
-    try:
-        neo4j_graph.run("RETURN 1 AS test")
-        print("\n------ Connected to Neo4j successfully ------\n")
-    except Exception as error:
-        print(f"\n------ Failed to connect to Neo4j: {error} ------\n")
-        raise error
+        print(f"Error building {description}: {e}")
+
+
+def cached_json_response(cache, key):
+    """
+    Decorator for JSON endpoints: serve the cached result when present and set
+    ETag/Last-Modified, so a matching conditional request gets a 304 without
+    running the view. Only successful responses are cached.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            entry = cache.get(key)
+            if entry is None:
+                response = view(*args, **kwargs)
+                if isinstance(response, tuple) or response.status_code != 200:
+                    return response
+                entry = cache.set(key, response.get_json())
+
+            response = jsonify(entry.value)
+            response.set_etag(entry.etag)
+            response.last_modified = entry.last_modified
+            response.cache_control.no_cache = True  # Browsers revalidate with If-None-Match
+            return response.make_conditional(request)
+        return wrapper
+    return decorator
 
-# Verify the MongoDB and Neo4j connections
-verify_connection()
 
 def setup():
-    """Sets up necessary indexes in MongoDB."""
+    """Sets up necessary indexes in MongoDB and constraints/indexes in Neo4j. Run once per deployment."""
     try:
         # Check existing indexes
         existing_indexes = jobs_collection.index_information()
@@ -60,32 +177,68 @@ def setup():
         else:
             print("\nFull-text index 'job_text_index' already exists.\n")
 
-        # # Create geospatial index for latitude and longitude
-        # if "job_location_index" not in jobs_collection.index_information():
-        #     jobs_collection.create_index([("location", "2dsphere")])
-        #     print("\nGeospatial index created successfully.\n")
+        # Compound indexes on the numeric salary fields written at ingest (see job_fields.py)
+        if "salary_range_index" not in existing_indexes:
+            jobs_collection.create_index([("salary_min", 1), ("salary_max", 1)], name="salary_range_index")
+            print("\nIndex 'salary_range_index' created successfully.\n")
+        if "work_type_salary_index" not in existing_indexes:
+            jobs_collection.create_index([("Work Type", 1), ("salary_min", 1), ("salary_max", 1)],
+                                         name="work_type_salary_index")
+            print("\nIndex 'work_type_salary_index' created successfully.\n")
+
+        # Job Id lookups (save counters, recommendations) and the rollup top-N reads
+        if "job_id_index" not in existing_indexes:
+            jobs_collection.create_index([("Job Id", 1)], name="job_id_index")
+            print("\nIndex 'job_id_index' created successfully.\n")
+        analytics_rollups.ensure_indexes(rollups_collection)
+
+        # Profile lookups by user_id; unique, so two signups can never share an ID
+        existing_user_indexes = users_collection.index_information()
+        if "user_id_index" in existing_user_indexes and not existing_user_indexes["user_id_index"].get("unique"):
+            users_collection.drop_index("user_id_index")
+            existing_user_indexes.pop("user_id_index")
+        if "user_id_index" not in existing_user_indexes:
+            users_collection.create_index([("user.user_id", 1)], name="user_id_index", unique=True)
+            print("\nUnique index 'user_id_index' created successfully.\n")
+
+        # Multikey index used to find users sharing a skill (see user_similarity.py)
+        if "user_skills_index" not in existing_user_indexes:
+            users_collection.create_index([("user_personal.skills", 1)], name="user_skills_index")
+            print("\nIndex 'user_skills_index' created successfully.\n")
+
+        # Sparse index finding the users with pending Neo4j outbox events (see neo4j_outbox.py)
+        if "user_outbox_index" not in existing_user_indexes:
+            users_collection.create_index([("neo4j_outbox.id", 1)], name="user_outbox_index", sparse=True)
+            print("\nIndex 'user_outbox_index' created successfully.\n")
+
+        # Geospatial index on the GeoJSON point written at ingest, used by $geoNear (see geo_search.py)
+        if "job_geo_index" not in existing_indexes:
+            jobs_collection.create_index([("geo", "2dsphere")], name="job_geo_index")
+            print("\nGeospatial index 'job_geo_index' created successfully.\n")
 
     except Exception as e:
         print(f"Error creating indexes: {e}")
 
-# Run the setup tasks
-setup()
-
+    try:
+        setup_neo4j_schema(neo4j_graph)
+    except Exception as e:
+        print(f"Error creating Neo4j schema: {e}")
 
 # Landing Page (Login/Sign-Up)
-@app.route("/", methods=["GET", "POST"])
+@views.route("/", methods=["GET", "POST"])
 def landing():
     if request.method == "POST":
         user_id = int(request.form.get("user_id"))  # Convert to integer for matching
-        user = users_collection.find_one({"user.user_id": user_id})
+        user = load_user(user_id)
         if user:
             session['user_id'] = user_id
-            return redirect(url_for("main"))
+            return redirect(url_for("views.main"))
         else:
             return render_template("landing.html", error="Invalid User ID")
     return render_template("landing.html")
 
-@app.route("/api/skill-demand")
+@views.route("/api/skill-demand")
+@cached_json_response(analytics_cache, "skill-demand")
 def skill_demand():
     try:
         query = """
@@ -93,35 +246,56 @@ def skill_demand():
         RETURN s.name AS skill, COUNT(j) AS demand
         ORDER BY demand DESC LIMIT 10
         """
-        result = neo4j_graph.run(query).data()
+        result = read_rollups("skill", lambda r: {"skill": r["key"], "demand": r["count"]},
+                              lambda: neo4j_graph.read(query, label="skill_demand"))
         return jsonify(result or [])
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-@app.route("/api/job-distribution")
+@views.route("/api/job-distribution")
+@cached_json_response(analytics_cache, "job-distribution")
 def job_distribution():
     pipeline = [
         {"$group": {"_id": "$Role", "count": {"$sum": 1}}},
         {"$sort": {"count": -1}},
         {"$limit": 10}
     ]
-    result = list(jobs_collection.aggregate(pipeline))
-    formatted_result = [{"role": r["_id"], "count": r["count"]} for r in result]
+    formatted_result = read_rollups(
+        "role", lambda r: {"role": r["key"], "count": r["count"]},
+        lambda: [{"role": r["_id"], "count": r["count"]} for r in jobs_collection.aggregate(pipeline)])
     return jsonify(formatted_result)
 
-@app.route("/api/average-salary")
+@views.route("/api/average-salary")
+@cached_json_response(analytics_cache, "average-salary")
 def average_salary():
+    # Average of each job's salary midpoint; can be answered from work_type_salary_index
     pipeline = [
-        {"$group": {"_id": "$Work Type", "average_salary": {"$avg": "$Salary Range"}}},
+        {"$match": {"salary_min": {"$gte": 0}, "salary_max": {"$gte": 0}}},
+        {"$sort": {"Work Type": 1}},
+        {"$group": {
+            "_id": "$Work Type",
+            "average_salary": {"$avg": {"$divide": [{"$add": ["$salary_min", "$salary_max"]}, 2]}}
+        }},
         {"$sort": {"average_salary": -1}}
     ]
-    result = list(jobs_collection.aggregate(pipeline))
+    rollups = analytics_rollups.top(rollups_collection, "work_type", limit=100, sort_field="salary_count")
+    if rollups:
+        result = [{"_id": r["key"], "average_salary": r["salary_sum"] / r["salary_count"]} for r in rollups]
+        result.sort(key=lambda r: r["average_salary"], reverse=True)
+    else:
+        result = list(jobs_collection.aggregate(pipeline))
     formatted_result = [{"work_type": r["_id"], "average_salary": round(r["average_salary"], 2)} for r in result]
     return jsonify(formatted_result)
 
 
+def read_rollups(kind, to_row, fallback, limit=10):
+    """Top-N rows from analytics_rollups, or the full aggregation if the rollups have not been built."""
+    rollups = analytics_rollups.top(rollups_collection, kind, limit)
+    return [to_row(r) for r in rollups] if rollups else fallback()
+
+
 # Sign-Up
-@app.route("/signup", methods=["GET", "POST"])
+@views.route("/signup", methods=["GET", "POST"])
 def signup():
     if request.method == "POST":
         name = request.form.get("name")
@@ -136,14 +310,9 @@ def signup():
         salary_min = int(request.form.get("salary_min", 0))
         salary_max = int(request.form.get("salary_max", 0))
 
-        # Generate unique User ID
-        max_id_doc = users_collection.find_one({}, sort=[("user.user_id", -1)])
-        user_id = max_id_doc["user"]["user_id"] + 1 if max_id_doc else 1
-
-        # Insert user into the database
-        users_collection.insert_one({
+        new_user = {
             "user": {
-                "user_id": user_id,
+                "user_id": None,  # Set by insert_new_user()
                 "name": name,
                 "email": email,
                 "password": password,
@@ -172,12 +341,17 @@ def signup():
                 "upskilling_interest": [],
                 "saved_jobs": []
             }
-        })
+        }
+
+        # Insert user into the database
+        user_id = insert_new_user(new_user)
+        profile_cache.invalidate(user_id)
 
-        neo4j_graph.run("""
+        neo4j_graph.write("""
                 MERGE (u:User {user_id: $user_id})
                 SET u.skills = $skills
-            """, user_id=user_id, skills=skills)
+            """, user_id=user_id, skills=skills, label="signup_user")
+        refresh_similar_users(user_id)
         
         return render_template("signup.html", success=f"User ID created: {user_id}")
     
@@ -185,89 +359,215 @@ def signup():
 
 
 # Main Page
-@app.route("/main", methods=["GET", "POST"])
+@views.route("/main", methods=["GET", "POST"])
 def main():
     if 'user_id' not in session:
-        return redirect(url_for("landing"))
+        return redirect(url_for("views.landing"))
     
-    user = users_collection.find_one({"user.user_id": session['user_id']})
-    search_results = []
-
-    recommender = neo4j_graph.run("""
-            MATCH (me:User {user_id: $user_id})
-            MATCH (other:User)-[:SAVED]->(j:Job)
-            WHERE other.user_id <> me.user_id
-            AND other.skills = me.skills
-            RETURN j.job_id as id
-            LIMIT 10
-        """, user_id=session['user_id']).data()
-
-    job_ids = [int(x["id"]) for x in recommender]
-    # print("******")
-    print(job_ids)
-    recommendations = list(jobs_collection.find({"Job Id": {"$in": job_ids}}).limit(10))
-    # print(recommendations)
-
+    user_id = session['user_id']
+    search_query = request.form.get("search_query") if request.method == "POST" else None
+
+    # The three lookup chains are independent, so the page waits for the slowest one, not their sum
+    started = time.perf_counter()
+    executor = page_query_executor()
+    recommended = executor.submit(timed_stage, "main", "recommendations", load_recommended_jobs, user_id)
+    relevant = executor.submit(timed_stage, "main", "relevant", load_user_and_relevant_jobs, user_id)
+    searched = None
     if request.method == "POST":
-        # Perform full-text search
-        search_query = request.form.get("search_query")
-        search_results = jobs_collection.find({
-            "$text": {"$search": search_query}
-        }, {"_id": 0, "Job Id": 1, "Job Title": 1, "Company": 1, "location": 1, "Salary Range": 1}).limit(10)
-
-    # Find relevant jobs based on OR filter for user's preferences
-    query_criteria = {
-        "$or": [
-            {"Location": user["user_personal"]["preferred_location"]},
-            {"Work Type": user["user_personal"]["work_type"]},
-            {"Preferred Industry": user["user_personal"]["preferred_industry"]},
-            {"Salary Range": user["user_job_preferences"]["preferred_salary_range"]},
-            {"Role": {"$in": user["user_job_preferences"]["preferred_roles"]}},
-            {"Skills": {"$in": user["user_job_preferences"]["upskilling_interest"]}}
-        ]
-    }
-
-    # Fetch jobs and filter for salary range dynamically
-    relevant_jobs = []
-    salary_min = user["user_job_preferences"]["preferred_salary_range"]["min"]
-    salary_max = user["user_job_preferences"]["preferred_salary_range"]["max"]
-
-    for job in jobs_collection.find(query_criteria).limit(30):  
-        job_min, job_max = extract_numeric_salary(job.get("Salary Range"))
-        if job_min is not None and job_max is not None:
-            # Add job if it falls within the user's salary range preference
-            if job_max >= salary_min and job_min <= salary_max:
-                relevant_jobs.append(job)
-        if len(relevant_jobs) >= 20:  # Limit to 20 relevant jobs
-            break
+        searched = executor.submit(timed_stage, "main", "search", search_jobs, search_query)
+
+    user, relevant_jobs, relevant_cursor = relevant.result()
+    recommendations, recommended_cursor = recommended.result()
+    search_results, search_cursor = searched.result() if searched else ([], None)
+    metrics_registry.observe("page.main.total", time.perf_counter() - started)
 
     return render_template(
         "main.html",
         user=user,
-        search_results=list(search_results),
+        search_query=search_query,
+        search_results=search_results,
         relevant_jobs=relevant_jobs,
-        recommended_jobs=recommendations
+        recommended_jobs=recommendations,
+        # "Load more" continues each list from these cursors through the /api/jobs/* endpoints
+        cursors={"search": search_cursor, "relevant": relevant_cursor, "recommended": recommended_cursor}
     )
 
-def extract_numeric_salary(salary_range):
-    """Extract min and max salary from a string like '$58K–$104K'."""
-    if not salary_range:
-        return None, None
 
+def load_recommended_jobs(user_id, limit=RECOMMENDED_PAGE_SIZE, after=None):
+    """
+    A page of recommended jobs and the next page's cursor. Precomputed lists are
+    paged by rank ({"rank": n}), the Neo4j fallback by ({"score", "id"}).
+    """
+    job_ids = None
+    next_cursor = None
+    if after is None or "rank" in after:
+        # Offline collaborative-filtering results (see collaborative_filtering.py), keyed by user;
+        # only the requested slice of the ranked list is read
+        rank = after["rank"] if after else 0
+        precomputed = timed_stage("main", "precomputed_recommendations", recommendations_collection.find_one,
+                                  {"user_id": user_id}, {"job_ids": {"$slice": [rank, limit + 1]}})
+        if precomputed and precomputed["job_ids"]:
+            job_ids, next_cursor = paginate(precomputed["job_ids"], limit, lambda _: {"rank": rank + limit})
+        elif after is not None:
+            job_ids = []  # Past the end of the precomputed list
+    if job_ids is None:
+        # Jobs saved by the user's precomputed most similar users (see user_similarity.py)
+        recommender = neo4j_graph.read("""
+                MATCH (me:User {user_id: $user_id})-[s:SIMILAR_USER]->(other:User)-[:SAVED]->(j:Job)
+                WITH j.job_id AS id, max(s.score) AS score
+                WHERE $after_score IS NULL OR score < $after_score
+                      OR (score = $after_score AND id > $after_id)
+                RETURN id, score
+                ORDER BY score DESC, id
+                LIMIT $limit
+            """, user_id=user_id, limit=limit + 1, after_score=after["score"] if after else None,
+            after_id=after["id"] if after else None, label="similar_user_recommendations")
+        recommender, next_cursor = paginate(recommender, limit, lambda x: {"score": x["score"], "id": x["id"]})
+        job_ids = [int(x["id"]) for x in recommender]
+
+    recommendations = timed_stage("main", "recommended_jobs", lambda: list(
+        jobs_collection.find({"Job Id": {"$in": job_ids}}, JOB_LIST_PROJECTION)))
+    recommendations.sort(key=lambda job: job_ids.index(job["Job Id"]))  # Keep the ranking order
+    return recommendations, next_cursor
+
+
+def load_user_and_relevant_jobs(user_id, limit=RELEVANT_PAGE_SIZE, after=None):
+    user = timed_stage("main", "user", load_user, user_id)
+
+    # Rank all jobs by skill match and preferences (skill_scoring.py), restricted to jobs whose
+    # salary range overlaps the user's preferred range; later pages continue after the last (score, Job Id)
+    ranked = timed_stage("main", "relevant_scoring", relevance_scorer.top_jobs, user, limit + 1,
+                         (after["score"], after["id"]) if after else None)
+    scores = dict(ranked)
+    jobs = timed_stage("main", "relevant_jobs", lambda: list(
+        jobs_collection.find({"Job Id": {"$in": list(scores)}}, JOB_LIST_PROJECTION)))
+    jobs_by_id = {job["Job Id"]: job for job in jobs}
+    relevant_jobs = [dict(jobs_by_id[job_id], score=score) for job_id, score in ranked if job_id in jobs_by_id]
+    relevant_jobs, next_cursor = paginate(relevant_jobs, limit,
+                                          lambda job: {"score": job["score"], "id": job["Job Id"]})
+    return user, relevant_jobs, next_cursor
+
+
+def search_jobs(search_query, limit=SEARCH_PAGE_SIZE, after=None):
+    # Perform full-text search, best matches first; later pages continue after the last (score, Job Id)
+    if not search_query or not search_query.strip():
+        return [], None
+    results = search_backend.search(search_query, limit=limit + 1,
+                                    after=(after["score"], after["id"]) if after else None)
+    return paginate(results, limit, lambda job: {"score": job["score"], "id": job["Job Id"]})
+
+
+def load_saved_jobs(user_id, limit=SAVED_PAGE_SIZE, after=None):
+    user = load_user(user_id)
+    query = {"Job Id": {"$in": [int(x) for x in user["user_job_preferences"]["saved_jobs"]]}}
+    if after:
+        query["Job Id"]["$gt"] = after["id"]
+    saved = list(jobs_collection.find(query, JOB_LIST_PROJECTION).sort("Job Id", 1).limit(limit + 1))
+    return paginate(saved, limit, lambda job: {"id": job["Job Id"]})
+
+
+def page_query_executor():
+    """Per-process thread pool for a page's concurrent lookups (recreated after fork like the connections)."""
+    return get_handle("page_query_executor", lambda: ThreadPoolExecutor(
+        max_workers=PAGE_QUERY_WORKERS, thread_name_prefix="page-query"))
+
+
+def timed_stage(page, stage, work, *args):
+    """Run one stage of a page and record its latency as page.<page>.<stage>."""
+    started = time.perf_counter()
+    error = False
+    try:
+        return work(*args)
+    except Exception:
+        error = True
+        raise
+    finally:
+        metrics_registry.observe(f"page.{page}.{stage}", time.perf_counter() - started, error=error)
+
+# Jobs near a point or city, nearest first, optionally filtered by keywords and salary
+@views.route("/api/jobs/near")
+def api_jobs_near():
+    if 'user_id' not in session:
+        return jsonify({"error": "Not logged in"}), 401
+    try:
+        latitude = request.args.get("lat", type=float)
+        longitude = request.args.get("lon", type=float)
+        radius_km = request.args.get("radius_km", type=float)
+        limit = request.args.get("k", 20, type=int)
+        salary_min = request.args.get("salary_min", type=int)
+        salary_max = request.args.get("salary_max", type=int)
+        text = request.args.get("q", "").strip() or None
+
+        if latitude is None or longitude is None or request.args.get("match_salary") == "1":
+            user = load_user(session['user_id'])
+            if request.args.get("match_salary") == "1":
+                salary_min = user["user_job_preferences"]["preferred_salary_range"]["min"]
+                salary_max = user["user_job_preferences"]["preferred_salary_range"]["max"]
+        if latitude is None or longitude is None:
+            # Centre on the given city, or the user's preferred location
+            city = request.args.get("city") or user["user_personal"]["preferred_location"]
+            center = geo_search.city_center(jobs_collection, city)
+            if center is None:
+                return jsonify({"error": f"No coordinates known for '{city}'"}), 404
+            latitude, longitude = center
+
+        jobs = timed_stage("jobs_near", "query", lambda: geo_search.near_jobs(
+            jobs_collection, latitude, longitude, radius_km=radius_km, limit=limit, text=text,
+            salary_min=salary_min, salary_max=salary_max, fallback_index=job_point_index))
+        return jsonify({"center": {"lat": latitude, "lon": longitude}, "jobs": jobs})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+# Pages of the main page's job lists and of the saved jobs, as JSON: {"jobs": [...], "next_cursor": ...}
+@views.route("/api/jobs/search")
+def api_search_jobs():
+    return job_page(lambda limit, after: search_jobs(request.args.get("q", ""), limit, after), SEARCH_PAGE_SIZE)
+
+
+@views.route("/api/jobs/relevant")
+def api_relevant_jobs():
+    return job_page(lambda limit, after: load_user_and_relevant_jobs(session['user_id'], limit, after)[1:],
+                    RELEVANT_PAGE_SIZE)
+
+
+@views.route("/api/jobs/recommended")
+def api_recommended_jobs():
+    return job_page(lambda limit, after: load_recommended_jobs(session['user_id'], limit, after),
+                    RECOMMENDED_PAGE_SIZE)
+
+
+@views.route("/api/jobs/saved")
+def api_saved_jobs():
+    return job_page(lambda limit, after: load_saved_jobs(session['user_id'], limit, after), SAVED_PAGE_SIZE)
+
+
+def job_page(load, default_limit):
+    """Call load(limit, after) with the request's `limit` and `cursor` and return the page as JSON."""
+    if 'user_id' not in session:
+        return jsonify({"error": "Not logged in"}), 401
+    try:
+        after = decode_cursor(request.args.get("cursor"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     try:
-        # Use regex to find all numbers in the salary range
-        salary_values = re.findall(r'\d+', salary_range)
-        if len(salary_values) == 2:
-            min_salary = int(salary_values[0]) * 1000  # Convert to full numbers
-            max_salary = int(salary_values[1]) * 1000
-            return min_salary, max_salary
+        jobs, next_cursor = load(page_size(request.args.get("limit", type=int), default_limit), after)
+        return jsonify({"jobs": jobs, "next_cursor": next_cursor})
     except Exception as e:
-        print(f"Error parsing salary range: {e}")
+        return jsonify({"error": str(e)}), 500
 
-    return None, None
+# Search box typeahead: titles, roles, skills and companies starting with the typed prefix
+@views.route("/api/suggest")
+def suggest():
+    try:
+        prefix = request.args.get("q", "")
+        limit = max(1, min(request.args.get("limit", 8, type=int), 20))
+        return jsonify(timed_stage("suggest", "lookup", suggester.suggest, prefix, limit))
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
 
 # Endpoint for Top 10 Most In-Demand Skills
-@app.route("/api/top-skills")
+@views.route("/api/top-skills")
+@cached_json_response(analytics_cache, "top-skills")
 def top_skills():
     query = """
         MATCH (s:Skill)<-[:REQUIRES_SKILL]-(j:Job)
@@ -275,11 +575,13 @@ def top_skills():
         ORDER BY demand DESC
         LIMIT 10
     """
-    result = neo4j_graph.run(query).data()
+    result = read_rollups("skill", lambda r: {"skill": r["key"], "demand": r["count"]},
+                          lambda: neo4j_graph.read(query, label="top_skills"))
     return jsonify(result)
 
 # Endpoint for Top 10 Companies with Most Job Postings
-@app.route("/api/top-companies")
+@views.route("/api/top-companies")
+@cached_json_response(analytics_cache, "top-companies")
 def top_companies():
     query = """
         MATCH (c:Company)<-[:POSTED_BY]-(j:Job)
@@ -287,63 +589,51 @@ def top_companies():
         ORDER BY job_count DESC
         LIMIT 10
     """
-    result = neo4j_graph.run(query).data()
+    result = read_rollups("company", lambda r: {"company": r["key"], "job_count": r["count"]},
+                          lambda: neo4j_graph.read(query, label="top_companies"))
     return jsonify(result)
 
 # Saved Jobs
-@app.route("/saved_jobs")
+@views.route("/saved_jobs")
 def saved_jobs():
     if 'user_id' not in session:
-        return redirect(url_for("landing"))
+        return redirect(url_for("views.landing"))
     
-    user = users_collection.find_one({"user.user_id": session['user_id']})
-    saved_jobs = jobs_collection.find({"Job Id": {"$in": [int(x) for x in user["user_job_preferences"]["saved_jobs"]]}})
-    return render_template("saved_jobs.html", saved_jobs=saved_jobs)
+    saved_jobs, next_cursor = load_saved_jobs(session['user_id'])
+    return render_template("saved_jobs.html", saved_jobs=saved_jobs, next_cursor=next_cursor)
 
 
 # Add job to saved jobs
-@app.route("/save_job/<job_id>")
+@views.route("/save_job/<job_id>")
 def save_job(job_id):
     if 'user_id' not in session:
-        return redirect(url_for("landing"))
+        return redirect(url_for("views.landing"))
     
-    user = users_collection.find_one({"user.user_id": session['user_id']})
-    if job_id not in user["user_job_preferences"]["saved_jobs"]:
-        users_collection.update_one(
-            {"user.user_id": session['user_id']},
-            {"$push": {"user_job_preferences.saved_jobs": job_id}}
-        )
-
-        neo4j_graph.run("""
-                MERGE (u:User {user_id: $user_id})
-                MERGE (j:Job {job_id: $job_id})
-                MERGE (u)-[:SAVED]->(j)
-            """, user_id=session['user_id'], job_id=job_id)
+    # The SAVED edge is written by the outbox flusher from the event recorded with the change (see neo4j_outbox.py)
+    if neo4j_outbox.record_save(users_collection, session['user_id'], job_id):
+        profile_cache.invalidate(session['user_id'])
+        record_save_rollups(job_id, 1)
 
-    return redirect(url_for("main"))
+    return redirect(url_for("views.main"))
 
 
 # Remove job from saved jobs
-@app.route("/remove_job/<job_id>")
+@views.route("/remove_job/<job_id>")
 def remove_job(job_id):
     if 'user_id' not in session:
-        return redirect(url_for("landing"))
+        return redirect(url_for("views.landing"))
     
-    users_collection.update_one(
-        {"user.user_id": session['user_id']},
-        {"$pull": {"user_job_preferences.saved_jobs": job_id}}
-    )
+    # The SAVED edge is deleted by the outbox flusher from the event recorded with the change (see neo4j_outbox.py)
+    was_saved = neo4j_outbox.record_unsave(users_collection, session['user_id'], job_id)
+    profile_cache.invalidate(session['user_id'])
+    if was_saved:
+        record_save_rollups(job_id, -1)
 
-    neo4j_graph.run("""
-        MATCH (u:User {user_id: $user_id})-[r:SAVED]->(j:Job {job_id: $job_id})
-        DELETE r
-    """, user_id=session['user_id'], job_id=job_id)
-
-    return redirect(url_for("saved_jobs"))
+    return redirect(url_for("views.saved_jobs"))
 
 
 # Insights Page
-@app.route("/insights")
+@views.route("/insights")
 def insights():
     # skill_trends = neo4j_graph.run("""
     #     MATCH (j:Job)-[:REQUIRES_SKILL]->(s:Skill)
@@ -351,29 +641,78 @@ def insights():
     #     ORDER BY demand DESC LIMIT 10
     # """).data()
 
-    # career_paths = neo4j_graph.run("""
-    #     MATCH (s:Skill)<-[:REQUIRES_SKILL]-(j:Job)-[:LEADS_TO]->(nextJob:Job)
-    #     RETURN nextJob.title AS next_role, COUNT(*) AS frequency
-    #     ORDER BY frequency DESC LIMIT 5
-    # """).data()
+    # Next roles from the LEADS_TO graph, precomputed per role by career_paths.py
+    career_paths = load_career_paths(session.get('user_id'))
 
-    best_cities = jobs_collection.aggregate([
-        {"$group": {"_id": "$location", "job_count": {"$sum": 1}}},
-        {"$sort": {"job_count": -1}},
-        {"$limit": 10}
-    ])
+    best_cities = analytics_cache.get_or_compute("best-cities", lambda: read_rollups(
+        "location", lambda r: {"_id": r["key"], "job_count": r["count"]},
+        lambda: list(jobs_collection.aggregate([
+            {"$group": {"_id": "$location", "job_count": {"$sum": 1}}},
+            {"$sort": {"job_count": -1}},
+            {"$limit": 10}
+        ])))).value
 
     # return render_template("insights.html", skill_trends=skill_trends, career_paths=career_paths, best_cities=best_cities)
-    return render_template("insights.html",best_cities=best_cities)
+    # Serve the last generated graph; a missing artifact is being generated in the background
+    return render_template("insights.html", best_cities=best_cities, career_paths=career_paths,
+                           graph_available=graph_artifact.artifact_exists())
+
+
+def load_career_paths(user_id):
+    """Precomputed next roles for the user's preferred roles, or for the most common roles."""
+    user = load_user(user_id) if user_id else None
+    roles = (user or {}).get("user_job_preferences", {}).get("preferred_roles") or []
+    if not roles:
+        roles = analytics_cache.get_or_compute("top-roles", lambda: read_rollups(
+            "role", lambda r: r["key"],
+            lambda: [r["_id"] for r in jobs_collection.aggregate([
+                {"$group": {"_id": "$Role", "count": {"$sum": 1}}},
+                {"$sort": {"count": -1}},
+                {"$limit": CAREER_PATH_ROLES}
+            ])], limit=CAREER_PATH_ROLES)).value
+    # Documents are keyed by the standardised role name (see career_paths.py)
+    role_keys = [standardize_role(role) for role in roles[:CAREER_PATH_ROLES]]
+    found = {doc["role_key"]: doc for doc in career_paths_collection.find(
+        {"role_key": {"$in": role_keys}}, {"_id": 0, "role_key": 1, "role": 1, "next_roles": 1})}
+    return [found[key] for key in role_keys if key in found]
+
+
+# Next roles and upskilling paths for a role, or the path to one target role
+@views.route("/api/career-paths")
+def api_career_paths():
+    role = request.args.get("role")
+    target = request.args.get("target")
+    if not role:
+        return jsonify({"error": "role is required"}), 400
+    try:
+        career_paths = career_paths_collection.find_one({"role_key": standardize_role(role)},
+                                                        {"_id": 0, "role_key": 0, "generated_at": 0})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    if career_paths is None:
+        return jsonify({"error": f"No career paths for role '{role}'"}), 404
+    if target:
+        path = next((path for path in career_paths["paths"]
+                     if standardize_role(path["target"]) == standardize_role(target)), None)
+        return jsonify({"role": career_paths["role"], "target": path["target"] if path else target, "path": path})
+    return jsonify(career_paths)
+
+
+@views.route("/api/graph/refresh", methods=["POST"])
+def refresh_graph():
+    """Regenerate the graph artifact on demand (skipped if the graph version is unchanged)."""
+    started = graph_artifact.refresh_in_background(neo4j_graph, force=request.args.get("force") == "1",
+                                                   extra_version=lambda: get_data_version(db))
+    return jsonify({"started": started}), 202
 
 
 # Profile Page
-@app.route("/profile", methods=["GET", "POST"])
+@views.route("/profile", methods=["GET", "POST"])
 def profile():
     if 'user_id' not in session:
-        return redirect(url_for("landing"))
+        return redirect(url_for("views.landing"))
     
-    user = users_collection.find_one({"user.user_id": session['user_id']})
+    user = load_user(session['user_id'])
     if request.method == "POST":
         updated_data = {
             "user.name": request.form.get("name"),
@@ -387,91 +726,98 @@ def profile():
             "user_job_preferences.preferred_salary_range.max": int(request.form.get("salary_max", 0)),
         }
         users_collection.update_one({"user.user_id": session['user_id']}, {"$set": updated_data})
+        profile_cache.invalidate(session['user_id'])
+
+        neo4j_graph.write("""
+                MERGE (u:User {user_id: $user_id})
+                SET u.skills = $skills
+            """, user_id=session['user_id'], skills=updated_data["user_personal.skills"], label="profile_user")
+        refresh_similar_users(session['user_id'])
 
-        return redirect(url_for("profile"))
+        return redirect(url_for("views.profile"))
     
     return render_template("profile.html", user=user)
 
 
+def user_id_allocator():
+    """Per-process allocator; a forked worker must not reuse its parent's reserved block."""
+    return get_handle("user_id_allocator", lambda: IdBlockAllocator(
+        db['counters'], "user_id", USER_ID_BLOCK_SIZE, current_max=max_user_id))
+
+
+def max_user_id():
+    """Largest user_id in use (an index-backed sort on user_id_index)."""
+    last = users_collection.find_one({}, {"user.user_id": 1}, sort=[("user.user_id", DESCENDING)])
+    return last["user"]["user_id"] if last else None
+
+
+def insert_new_user(new_user):
+    """Insert a user document under a freshly allocated user_id and return the ID."""
+    for attempt in range(USER_ID_ATTEMPTS):
+        new_user["user"]["user_id"] = user_id_allocator().allocate()
+        try:
+            users_collection.insert_one(new_user)
+            return new_user["user"]["user_id"]
+        except DuplicateKeyError:
+            # The ID was written without going through the counter; catch up and try again
+            print(f"User ID {new_user['user']['user_id']} is taken; resyncing the ID allocator.")
+            user_id_allocator().resync()
+    raise RuntimeError(f"Could not allocate a free user ID after {USER_ID_ATTEMPTS} attempts.")
+
+
+def load_user(user_id):
+    """User document through the profile cache (see profile_cache.py); None if there is no such user."""
+    return profile_cache.get(user_id, lambda: users_collection.find_one({"user.user_id": user_id}))
+
+
+def record_save_rollups(job_id, sign):
+    """Keeps the save counters in analytics_rollups current; a failure is fixed by the next rebuild."""
+    try:
+        analytics_rollups.record_save(rollups_collection, jobs_collection, job_id, sign)
+    except Exception as e:
+        print(f"Error updating analytics rollups for job {job_id}: {e}")
+
+
+def refresh_similar_users(user_id):
+    """Keeps the user's SIMILAR_USER neighbours current; a failure only delays recommendations."""
+    try:
+        refresh_user(users_collection, neo4j_graph, user_id)
+    except Exception as e:
+        print(f"Error refreshing similar users for user {user_id}: {e}")
+
+
 # Logout
-@app.route("/logout")
+@views.route("/logout")
 def logout():
     session.clear()
-    return redirect(url_for("landing"))
-
-
-# Neo4j graph nodes visualization
-def generate_graph():
-    driver = GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASSWORD))
-    net = Network(notebook=False, height="600px", width="100%", bgcolor="#ffffff", font_color="black")
-
-    # Query Neo4j for Company -> Job -> Skill relationships
-    with driver.session() as session:
-        result = session.run(
-            "MATCH (j:Job)-[:POSTED_BY]->(c:Company) "
-            "OPTIONAL MATCH (j)-[:REQUIRES_SKILL]->(s:Skill) "
-            "RETURN c, j, s "
-            "LIMIT 100"
-        )
-
-        for record in result:
-            # Extract nodes
-            company = record["c"]
-            job = record["j"]
-            skill = record["s"]
-
-            # print("company: ", company)
-            # print("job: ", job)
-            # print("skill: ", skill)
-
-            # Add Company node
-            if company:
-                company_id = str(company.id)
-                company_name = company.get('name', "Unknown Company")
-                net.add_node(
-                    company_id,
-                    label=f"Company: {company_name}",
-                    title=f"Company: {company_name}",
-                    color="green"
-                )
-            # Add Job node
-            if job:
-                job_id = str(job.id)
-                job_title = job.get('title', "Unknown Job")
-                role = job.get('role', "Unknown Role")
-                net.add_node(
-                    job_id,
-                    label=f"Job: {job_title}",
-                    title=(
-                        f"Job ID: {job.get('job_id', 'N/A')}\n"
-                        f"Role: {role}\n"
-                        f"Location: {job.get('location', 'N/A')}"
-                    ),
-                    color="red"
-                )
-                # Connect Job to Company
-                if company:
-                    net.add_edge(company_id, job_id, title="POSTED_BY")
-
-            # Add Skill node and connect it to Job
-            if skill:
-                skill_id = str(skill.id)
-                skill_name = skill.get('name', "Unknown Skill")
-                net.add_node(
-                    skill_id,
-                    label=f"Skill: {skill_name}",
-                    title=f"Skill: {skill_name}",
-                    color="blue"
-                )
-                net.add_edge(job_id, skill_id, title="REQUIRES_SKILL")
-
-    # Save the graph to 'static/interactive_graph.html'
-    net.save_graph("static/interactive_graph.html")
-    driver.close()
-
-generate_graph()
+    return redirect(url_for("views.landing"))
+
+
+# Liveness: the process is up and serving requests
+@views.route("/healthz")
+def healthz():
+    return jsonify({"status": "ok"})
+
+
+# Readiness: both databases answer a ping
+@views.route("/readyz")
+def readyz():
+    databases = check_health()
+    ready = all(check["ok"] for check in databases.values())
+    return jsonify({"status": "ready" if ready else "unavailable", "databases": databases}), 200 if ready else 503
+
+
+# Query latency/row counts (neo4j.<label>) and cache statistics for this process
+@views.route("/metrics")
+def metrics():
+    return jsonify(metrics_registry.snapshot())
+
+
+app = create_app()
 
 
 if __name__ == "__main__":
-    app.run(debug=True, port=5002)  # Change 5001 to any available port
- 
+    try:
+        app.run(debug=True, port=5002)  # Change 5001 to any available port
+    finally:
+        close_connections()
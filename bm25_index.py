@@ -0,0 +1,327 @@
+"""
+In-process BM25 inverted index over job documents (see search_backends.py).
+
+Each job is one document whose term frequencies are summed over the searched
+fields with per-field boosts (FIELD_BOOSTS), and whose length is the boosted
+token count. A query scores every job containing one of its terms with
+
+    idf(t) * tf * (K1 + 1) / (tf + K1 * (1 - B + B * length / avg_length))
+
+summed over the query terms, where idf(t) = ln(1 + (N - df + 0.5) / (df + 0.5)).
+
+The index has two segments:
+
+  base    compact arrays written by save(): a sorted term array, per-term offsets
+          into one int32 array of document numbers and one float32 array of
+          boosted term frequencies, and per-document lengths and Job Ids. load()
+          memory-maps them, so opening even a large index is instant and the
+          pages are shared by every worker process.
+  delta   jobs added since the last save, in ordinary dicts and lists.
+
+Adding a job that is already indexed (by Job Id) marks its old document deleted;
+deleted documents are skipped by queries and dropped by the next save(), which
+merges both segments into a new base. Saves write a new generation directory
+and then switch the CURRENT pointer file, so readers never see a partial index.
+"""
+from collections import defaultdict
+import json
+import math
+import os
+import re
+import shutil
+import threading
+import time
+import numpy as np
+
+# Searched fields and their weight in a document's term frequencies
+FIELD_BOOSTS = {
+    "Job Title": 3.0,
+    "Role": 2.0,
+    "skills": 2.0,
+    "Company": 1.5,
+    "location": 1.5,
+    "Job Description": 1.0,
+}
+
+# BM25 term-frequency saturation and length normalisation
+K1 = 1.2
+B = 0.75
+
+# Longer tokens are truncated, which keeps the on-disk term array small
+MAX_TERM_LENGTH = 32
+
+STOPWORDS = frozenset("""
+a an and are as at be by for from has have in is it its of on or our that the their this to we
+will with you your
+""".split())
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9][a-z0-9+#]*")
+
+INDEX_FILES = ["terms", "offsets", "docs", "weights", "lengths", "job_ids"]
+
+
+def tokenize(text):
+    """Lowercased alphanumeric tokens (keeping e.g. 'c++', 'c#'), without stopwords."""
+    if not text:
+        return []
+    if isinstance(text, (list, tuple)):
+        text = " ".join(map(str, text))
+    return [token[:MAX_TERM_LENGTH] for token in TOKEN_PATTERN.findall(str(text).lower())
+            if token not in STOPWORDS]
+
+
+def job_terms(job):
+    """Boosted term frequencies and boosted length of a job document."""
+    frequencies = defaultdict(float)
+    length = 0.0
+    for field, boost in FIELD_BOOSTS.items():
+        tokens = tokenize(job.get(field))
+        for token in tokens:
+            frequencies[token] += boost
+        length += boost * len(tokens)
+    return frequencies, length
+
+
+class BM25Index:
+    def __init__(self):
+        self.lock = threading.Lock()
+        # Base segment (numpy arrays, memory-mapped after load())
+        self.terms = np.array([], dtype=f"<U{MAX_TERM_LENGTH}")
+        self.offsets = np.zeros(1, dtype=np.int64)
+        self.docs = np.array([], dtype=np.int32)
+        self.weights = np.array([], dtype=np.float32)
+        self.base_lengths = np.array([], dtype=np.float32)
+        self.base_job_ids = np.array([], dtype=np.int64)
+        # Delta segment: documents numbered from len(base_job_ids) on
+        self.delta_postings = defaultdict(lambda: ([], []))
+        self.delta_lengths = []
+        self.delta_job_ids = []
+        # Deleted document numbers and the live document per Job Id (built on first update)
+        self.deleted = set()
+        self.doc_by_job_id = None
+        self.total_length = 0.0
+        self.live_docs = 0
+        # Concatenated lengths/Job Ids of both segments, rebuilt after the delta changes
+        self.all_lengths = None
+        self.all_job_ids = None
+        # Stored with the index, e.g. the last MongoDB _id indexed
+        self.meta = {}
+
+    def __len__(self):
+        return self.live_docs
+
+    def document_count(self):
+        return len(self.base_job_ids) + len(self.delta_job_ids)
+
+    def add_jobs(self, jobs):
+        """Index (or re-index, by Job Id) job documents. Returns the number added."""
+        added = 0
+        with self.lock:
+            self.ensure_job_map()
+            for job in jobs:
+                job_id = int(job["Job Id"])
+                self.delete_doc(self.doc_by_job_id.get(job_id))
+                frequencies, length = job_terms(job)
+                doc = self.document_count()
+                for term, frequency in frequencies.items():
+                    docs, weights = self.delta_postings[term]
+                    docs.append(doc)
+                    weights.append(frequency)
+                self.delta_lengths.append(length)
+                self.delta_job_ids.append(job_id)
+                self.doc_by_job_id[job_id] = doc
+                self.total_length += length
+                self.live_docs += 1
+                added += 1
+            self.all_lengths = self.all_job_ids = None
+        return added
+
+    def remove_job(self, job_id):
+        with self.lock:
+            self.ensure_job_map()
+            self.delete_doc(self.doc_by_job_id.pop(int(job_id), None))
+
+    def ensure_job_map(self):
+        if self.doc_by_job_id is None:
+            self.doc_by_job_id = {int(job_id): doc for doc, job_id in enumerate(self.job_id_array())
+                                  if doc not in self.deleted}
+
+    def delete_doc(self, doc):
+        if doc is None or doc in self.deleted:
+            return
+        self.deleted.add(doc)
+        base_count = len(self.base_lengths)
+        length = self.base_lengths[doc] if doc < base_count else self.delta_lengths[doc - base_count]
+        self.total_length -= float(length)
+        self.live_docs -= 1
+
+    def length_array(self):
+        if self.all_lengths is None:
+            self.all_lengths = np.concatenate([self.base_lengths, np.array(self.delta_lengths, dtype=np.float32)])
+        return self.all_lengths
+
+    def job_id_array(self):
+        if self.all_job_ids is None:
+            self.all_job_ids = np.concatenate([self.base_job_ids, np.array(self.delta_job_ids, dtype=np.int64)])
+        return self.all_job_ids
+
+    def postings(self, term):
+        """Document numbers and boosted frequencies of a term across both segments."""
+        docs, weights = [], []
+        position = int(np.searchsorted(self.terms, term))
+        if position < len(self.terms) and self.terms[position] == term:
+            start, end = self.offsets[position], self.offsets[position + 1]
+            docs.append(self.docs[start:end])
+            weights.append(self.weights[start:end])
+        if term in self.delta_postings:
+            delta_docs, delta_weights = self.delta_postings[term]
+            docs.append(np.array(delta_docs, dtype=np.int32))
+            weights.append(np.array(delta_weights, dtype=np.float32))
+        if not docs:
+            return None, None
+        return np.concatenate(docs), np.concatenate(weights)
+
+    def search(self, query, limit=10, offset=0, after=None):
+        """
+        Best-scoring (job_id, score) pairs for a query, highest score first (ties by Job Id).
+        `after` is the (score, job_id) of the last result of the previous page.
+        """
+        with self.lock:
+            if not self.live_docs:
+                return []
+            lengths = self.length_array()
+            job_ids = self.job_id_array()
+            average_length = max(self.total_length / self.live_docs, 1e-9)
+            matched_docs, contributions = [], []
+            for term in set(tokenize(query)):
+                docs, frequencies = self.postings(term)
+                if docs is None:
+                    continue
+                idf = math.log(1 + (self.live_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+                norm = K1 * (1 - B + B * lengths[docs] / average_length)
+                matched_docs.append(docs)
+                contributions.append(idf * frequencies * (K1 + 1) / (frequencies + norm))
+            deleted = np.fromiter(self.deleted, dtype=np.int64, count=len(self.deleted))
+        if not matched_docs:
+            return []
+
+        # Sum the per-term contributions of each matched document: a dense accumulator
+        # over all documents is cheapest unless the query matched only a few of them
+        all_docs, all_contributions = np.concatenate(matched_docs), np.concatenate(contributions)
+        if len(all_docs) * 16 >= len(job_ids):
+            scores = np.bincount(all_docs, weights=all_contributions, minlength=len(job_ids))
+            docs = np.flatnonzero(scores)
+            scores = scores[docs]
+        else:
+            docs, inverse = np.unique(all_docs, return_inverse=True)
+            scores = np.bincount(inverse, weights=all_contributions)
+        if len(deleted):
+            alive = ~np.isin(docs, deleted)
+            docs, scores = docs[alive], scores[alive]
+        if after is not None:
+            after_score, after_job_id = after
+            later = (scores < after_score) | ((scores == after_score) & (job_ids[docs] > after_job_id))
+            docs, scores = docs[later], scores[later]
+
+        wanted = offset + limit
+        if wanted <= 0 or not len(docs):
+            return []
+        if wanted < len(docs):
+            # Everything scoring at least the wanted-th best, so ties at the cut are ordered by Job Id
+            threshold = -np.partition(-scores, wanted - 1)[wanted - 1]
+            top = scores >= threshold
+            docs, scores = docs[top], scores[top]
+        order = np.lexsort((job_ids[docs], -scores))[offset:wanted]
+        return [(int(job_ids[docs[i]]), float(scores[i])) for i in order]
+
+    def stats(self):
+        return {
+            "documents": self.live_docs,
+            "terms": len(self.terms),
+            "delta_documents": len(self.delta_job_ids),
+            "deleted": len(self.deleted),
+        }
+
+    def merged_arrays(self):
+        """Both segments merged into base-segment arrays, without deleted documents."""
+        total = self.document_count()
+        alive = np.ones(total, dtype=bool)
+        if self.deleted:
+            alive[list(self.deleted)] = False
+        renumber = np.cumsum(alive, dtype=np.int64) - 1
+
+        terms = sorted(set(self.terms.tolist()) | set(self.delta_postings))
+        offsets = [0]
+        all_docs, all_weights, kept_terms = [], [], []
+        for term in terms:
+            docs, weights = self.postings(term)
+            keep = alive[docs]
+            if not keep.any():
+                continue
+            kept_terms.append(term)
+            all_docs.append(renumber[docs[keep]].astype(np.int32))
+            all_weights.append(weights[keep].astype(np.float32))
+            offsets.append(offsets[-1] + int(keep.sum()))
+        return {
+            "terms": np.array(kept_terms, dtype=f"<U{MAX_TERM_LENGTH}"),
+            "offsets": np.array(offsets, dtype=np.int64),
+            "docs": np.concatenate(all_docs) if all_docs else np.array([], dtype=np.int32),
+            "weights": np.concatenate(all_weights) if all_weights else np.array([], dtype=np.float32),
+            "lengths": self.length_array()[alive],
+            "job_ids": self.job_id_array()[alive],
+        }
+
+    def save(self, index_dir):
+        """Write the merged index as a new generation and point CURRENT at it."""
+        with self.lock:
+            arrays = self.merged_arrays()
+            meta = dict(self.meta, documents=len(arrays["job_ids"]), saved_at=time.time())
+        generation = f"gen-{int(time.time() * 1000)}-{os.getpid()}"
+        generation_dir = os.path.join(index_dir, generation)
+        os.makedirs(generation_dir)
+        for name in INDEX_FILES:
+            np.save(os.path.join(generation_dir, f"{name}.npy"), arrays[name])
+        with open(os.path.join(generation_dir, "meta.json"), "w") as f:
+            json.dump(meta, f)
+
+        pointer = os.path.join(index_dir, "CURRENT")
+        previous = read_current(index_dir)
+        with open(f"{pointer}.tmp", "w") as f:
+            f.write(generation)
+        os.replace(f"{pointer}.tmp", pointer)
+        # Processes that mapped the old generation keep their open files
+        if previous and previous != generation:
+            shutil.rmtree(os.path.join(index_dir, previous), ignore_errors=True)
+        return generation_dir
+
+    @classmethod
+    def load(cls, index_dir, mmap=True):
+        """Open the current generation of a saved index, or return None if there is none."""
+        generation = read_current(index_dir)
+        if generation is None:
+            return None
+        generation_dir = os.path.join(index_dir, generation)
+        arrays = {name: np.load(os.path.join(generation_dir, f"{name}.npy"), mmap_mode="r" if mmap else None)
+                  for name in INDEX_FILES}
+        with open(os.path.join(generation_dir, "meta.json")) as f:
+            meta = json.load(f)
+
+        index = cls()
+        index.terms = arrays["terms"]
+        index.offsets = arrays["offsets"]
+        index.docs = arrays["docs"]
+        index.weights = arrays["weights"]
+        index.base_lengths = arrays["lengths"]
+        index.base_job_ids = arrays["job_ids"]
+        index.total_length = float(np.sum(index.base_lengths, dtype=np.float64))
+        index.live_docs = len(index.base_job_ids)
+        index.meta = meta
+        return index
+
+
+def read_current(index_dir):
+    try:
+        with open(os.path.join(index_dir, "CURRENT")) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
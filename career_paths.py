@@ -0,0 +1,265 @@
+"""
+Offline career-path graph between job roles, for the Insights page.
+
+Roles are compared by the skills their jobs require ((:Job)-[:REQUIRES_SKILL]->(:Skill)).
+A role's skill profile is the set of skills required by at least MIN_SKILL_SHARE of
+its jobs, and two roles are as similar as the Jaccard index of their profiles, computed
+for all pairs with one sparse product of the binary role x skill matrix. Role A leads
+to role B when the two are at least MIN_SIMILARITY alike and B asks for more experience
+(the mean midpoint of the "Experience" ranges of its jobs in MongoDB). The strongest
+MAX_NEXT_ROLES transitions of each role are materialised in Neo4j as
+(:Role)-[:LEADS_TO {weight, shared_skills}]->(:Role), weight being the Jaccard index.
+
+Roles are matched across both stores by job_fields.standardize_role, the form
+populate_neo4j.py stores on Job nodes; they are shown under the most common
+spelling of the MongoDB Role, and the documents are looked up by `role_key`.
+
+The answers the page needs are then precomputed into the `career_paths` collection,
+one document per role:
+
+    next_roles  the role's LEADS_TO transitions, best first, with the skills to learn
+    paths       the cheapest upskilling path to each reachable role (Dijkstra over the
+                LEADS_TO edges; a step costs the number of new skills it needs plus one,
+                so paths need the fewest new skills, then the fewest role changes)
+
+so a page view is one indexed read. Re-run after importing jobs:
+
+    python career_paths.py
+"""
+from collections import Counter
+from datetime import datetime
+import re
+import numpy as np
+from scipy import sparse
+from scipy.sparse.csgraph import dijkstra
+from pymongo import MongoClient, ReplaceOne
+from job_fields import standardize_role
+from neo4j_client import Neo4jClient
+
+# Share of a role's jobs that must require a skill for it to be part of the role's profile
+MIN_SKILL_SHARE = 0.2
+
+# Minimum Jaccard similarity of two roles' skill profiles for a LEADS_TO edge
+MIN_SIMILARITY = 0.1
+
+# LEADS_TO edges kept per role
+MAX_NEXT_ROLES = 10
+
+# Upskilling paths stored per role, cheapest first
+MAX_PATHS_PER_ROLE = 50
+
+# Number of rows per UNWIND query or bulk request
+WRITE_BATCH_SIZE = 500
+
+EXPERIENCE_PATTERN = re.compile(r"(\d+)\D+(\d+)")
+
+
+def experience_years(experience):
+    """Midpoint of an experience range like '5 to 15 Years', or None."""
+    match = EXPERIENCE_PATTERN.search(experience or "")
+    return (int(match.group(1)) + int(match.group(2))) / 2 if match else None
+
+
+def export_role_skills(neo4j, min_share=MIN_SKILL_SHARE):
+    """{role key: set of profile skills} from the REQUIRES_SKILL relation."""
+    totals = Counter()
+    for row in neo4j.read("""
+        MATCH (j:Job)
+        WHERE j.role IS NOT NULL AND EXISTS { (j)-[:REQUIRES_SKILL]->(:Skill) }
+        RETURN j.role AS role, count(j) AS jobs
+    """, label="export_role_job_counts"):
+        totals[standardize_role(row["role"])] += row["jobs"]
+    skill_jobs = Counter()
+    for row in neo4j.read("""
+        MATCH (j:Job)-[:REQUIRES_SKILL]->(s:Skill)
+        WHERE j.role IS NOT NULL
+        RETURN j.role AS role, s.name AS skill, count(DISTINCT j) AS jobs
+    """, label="export_role_skills"):
+        skill_jobs[(standardize_role(row["role"]), row["skill"])] += row["jobs"]
+
+    role_skills = {}
+    for (role, skill), jobs in skill_jobs.items():
+        if role and jobs >= min_share * totals[role]:
+            role_skills.setdefault(role, set()).add(skill)
+    return role_skills
+
+
+def export_role_experience(jobs_collection):
+    """
+    ({role key: mean experience midpoint in years}, {role key: display name}) over the jobs with a
+    parsable Experience range. The display name is the most common MongoDB spelling of the role.
+    """
+    totals = {}
+    spellings = Counter()
+    for row in jobs_collection.aggregate([
+        {"$group": {"_id": {"role": "$Role", "experience": "$Experience"}, "jobs": {"$sum": 1}}}
+    ]):
+        role = row["_id"].get("role")
+        years = experience_years(row["_id"].get("experience"))
+        if role and standardize_role(role) and years is not None:
+            total = totals.setdefault(standardize_role(role), [0.0, 0])
+            total[0] += years * row["jobs"]
+            total[1] += row["jobs"]
+            spellings[(standardize_role(role), role)] += row["jobs"]
+    names = {}
+    for (key, role), _ in sorted(spellings.items(), key=lambda item: (-item[1], item[0][1])):
+        names.setdefault(key, role)
+    return {role: years / jobs for role, (years, jobs) in totals.items()}, names
+
+
+def build_transitions(role_skills, experience, min_similarity=MIN_SIMILARITY, max_next=MAX_NEXT_ROLES):
+    """
+    LEADS_TO edges between the roles that have both a skill profile and an experience level.
+    Returns (roles, [(source index, target index, weight, shared skill count), ...]) with each
+    role's edges best first. The role x role matrices are dense; a dataset has hundreds of roles.
+    """
+    roles = sorted(role for role, skills in role_skills.items() if skills and role in experience)
+    skills = sorted(set().union(*(role_skills[role] for role in roles)))
+    skill_index = {skill: i for i, skill in enumerate(skills)}
+    rows = [i for i, role in enumerate(roles) for _ in role_skills[role]]
+    cols = [skill_index[skill] for role in roles for skill in role_skills[role]]
+    matrix = sparse.csr_matrix((np.ones(len(rows), dtype=np.float32), (rows, cols)),
+                               shape=(len(roles), len(skills)))
+
+    shared = (matrix @ matrix.T).toarray()
+    sizes = np.diag(shared).copy()
+    union = sizes[:, None] + sizes[None, :] - shared
+    similarity = np.divide(shared, union, out=np.zeros_like(shared), where=union > 0)
+    years = np.array([experience[role] for role in roles])
+    # Only towards roles that need more experience, so the graph has no cycles
+    similarity[(similarity < min_similarity) | (years[None, :] <= years[:, None])] = 0
+
+    transitions = []
+    for source in range(len(roles)):
+        targets = np.flatnonzero(similarity[source])
+        if len(targets) > max_next:
+            targets = targets[np.argpartition(-similarity[source, targets], max_next - 1)[:max_next]]
+        targets = targets[np.lexsort((targets, -similarity[source, targets]))]
+        transitions.extend((source, int(target), float(similarity[source, target]), int(shared[source, target]))
+                           for target in targets)
+    return roles, transitions
+
+
+def upskilling_paths(roles, role_skills, transitions, names, max_paths=MAX_PATHS_PER_ROLE):
+    """
+    {role key: [{"target", "roles", "new_skills", "cost"}, ...]}: the cheapest LEADS_TO path from
+    each role to every reachable role (by display name), cheapest first, from one all-sources
+    Dijkstra run.
+    """
+    if not transitions:
+        return {role: [] for role in roles}
+    sources, targets = [t[0] for t in transitions], [t[1] for t in transitions]
+    costs = [1 + len(role_skills[roles[target]] - role_skills[roles[source]])
+             for source, target in zip(sources, targets)]
+    graph = sparse.csr_matrix((costs, (sources, targets)), shape=(len(roles), len(roles)))
+    distances, predecessors = dijkstra(graph, directed=True, return_predecessors=True)
+
+    paths = {}
+    for source, role in enumerate(roles):
+        reachable = np.flatnonzero(np.isfinite(distances[source]))
+        reachable = reachable[reachable != source]
+        reachable = reachable[np.lexsort((reachable, distances[source, reachable]))][:max_paths]
+        paths[role] = []
+        for target in reachable:
+            steps = [int(target)]
+            while steps[-1] != source:
+                steps.append(int(predecessors[source, steps[-1]]))
+            steps.reverse()
+            known = set(role_skills[role])
+            new_skills = []
+            for step in steps[1:]:
+                new_skills.extend(sorted(role_skills[roles[step]] - known))
+                known |= role_skills[roles[step]]
+            paths[role].append({"target": names[roles[target]], "roles": [names[roles[step]] for step in steps],
+                                "new_skills": new_skills, "cost": int(distances[source, target])})
+    return paths
+
+
+def write_transitions(neo4j, roles, role_skills, experience, names, transitions, generated_at):
+    """Replace the Role nodes' LEADS_TO edges with the given transitions."""
+    nodes = [{"name": names[role], "skills": sorted(role_skills[role]), "experience_years": experience[role]}
+             for role in roles]
+    for start in range(0, len(nodes), WRITE_BATCH_SIZE):
+        neo4j.write("""
+            UNWIND $nodes AS node
+            MERGE (r:Role {name: node.name})
+            SET r.skills = node.skills, r.experience_years = node.experience_years
+        """, nodes=nodes[start:start + WRITE_BATCH_SIZE], label="merge_roles")
+
+    edges = [{"source": names[roles[source]], "target": names[roles[target]], "weight": weight,
+              "shared_skills": shared}
+             for source, target, weight, shared in transitions]
+    for start in range(0, len(edges), WRITE_BATCH_SIZE):
+        neo4j.write("""
+            UNWIND $edges AS edge
+            MATCH (a:Role {name: edge.source})
+            MATCH (b:Role {name: edge.target})
+            MERGE (a)-[t:LEADS_TO]->(b)
+            SET t.weight = edge.weight, t.shared_skills = edge.shared_skills, t.generated_at = $generated_at
+        """, edges=edges[start:start + WRITE_BATCH_SIZE], generated_at=generated_at, label="write_leads_to")
+
+    # Transitions that no longer qualify should not linger from earlier runs
+    neo4j.write("""
+        MATCH (:Role)-[t:LEADS_TO]->(:Role)
+        WHERE t.generated_at IS NULL OR t.generated_at < $generated_at
+        DELETE t
+    """, generated_at=generated_at, label="drop_stale_leads_to")
+
+
+def write_career_paths(career_paths_collection, roles, role_skills, experience, names, transitions, paths,
+                       generated_at):
+    """One document per role with its next roles and upskilling paths."""
+    next_roles = {role: [] for role in roles}
+    for source, target, weight, shared in transitions:
+        next_roles[roles[source]].append({
+            "role": names[roles[target]],
+            "weight": round(weight, 6),
+            "shared_skills": shared,
+            "new_skills": sorted(role_skills[roles[target]] - role_skills[roles[source]]),
+        })
+
+    career_paths_collection.create_index("role_key", unique=True, name="career_paths_role_key_index")
+    requests = [ReplaceOne({"role_key": role}, {
+        "role_key": role,
+        "role": names[role],
+        "experience_years": round(experience[role], 2),
+        "skills": sorted(role_skills[role]),
+        "next_roles": next_roles[role],
+        "paths": paths[role],
+        "generated_at": generated_at,
+    }, upsert=True) for role in roles]
+    for start in range(0, len(requests), WRITE_BATCH_SIZE):
+        career_paths_collection.bulk_write(requests[start:start + WRITE_BATCH_SIZE], ordered=False)
+
+    # Roles that dropped out of the data should not keep stale answers
+    career_paths_collection.delete_many({"generated_at": {"$lt": generated_at}})
+    return len(requests)
+
+
+def run(neo4j, jobs_collection, career_paths_collection):
+    """Rebuild the LEADS_TO graph and the precomputed career paths."""
+    generated_at = datetime.now()
+    role_skills = export_role_skills(neo4j)
+    experience, names = export_role_experience(jobs_collection)
+    roles, transitions = build_transitions(role_skills, experience)
+    if not roles:
+        print("No roles with both required skills and experience ranges found. Nothing to build.")
+        return 0
+    print(f"Built {len(transitions)} LEADS_TO transitions between {len(roles)} roles.")
+
+    paths = upskilling_paths(roles, role_skills, transitions, names)
+    write_transitions(neo4j, roles, role_skills, experience, names, transitions, generated_at)
+    written = write_career_paths(career_paths_collection, roles, role_skills, experience, names,
+                                 transitions, paths, generated_at)
+    print(f"Stored career paths for {written} roles.")
+    return written
+
+
+if __name__ == "__main__":
+    from config import ATLAS_URI, DB_NAME
+
+    client = MongoClient(ATLAS_URI)
+    neo4j = Neo4jClient.from_config()
+    run(neo4j, client[DB_NAME]['jobs'], client[DB_NAME]['career_paths'])
+    neo4j.close()
+    client.close()
@@ -0,0 +1,135 @@
+"""
+Offline item-item collaborative filtering over (:User)-[:SAVED]->(:Job) edges.
+
+The SAVED relation is exported into a sparse binary user x job matrix X. Job-job
+cosine similarity S = Xn^T Xn (Xn = X with unit-norm columns) and user scores
+X S are computed with sparse matrix products, and the top-N unsaved jobs per user
+are written to the `recommendations` collection, which main() reads by user_id.
+"""
+from datetime import datetime
+import numpy as np
+from scipy import sparse
+from pymongo import MongoClient, ReplaceOne
+from neo4j_client import Neo4jClient
+
+# Number of recommended jobs stored per user
+TOP_N = 10
+
+# Number of users scored per sparse matrix product (bounds peak memory)
+USER_BLOCK_SIZE = 2000
+
+# Number of recommendation documents written per bulk request
+WRITE_BATCH_SIZE = 1000
+
+
+def export_saved_edges(neo4j):
+    """All (user_id, job_id) pairs of the SAVED relation."""
+    rows = neo4j.read("""
+        MATCH (u:User)-[:SAVED]->(j:Job)
+        RETURN u.user_id AS user_id, j.job_id AS job_id
+    """, label="export_saved_edges")
+    return [(row["user_id"], row["job_id"]) for row in rows]
+
+
+def build_matrix(edges):
+    """Binary CSR user x job matrix plus the user and job ids for its rows and columns."""
+    user_ids = sorted({user_id for user_id, _ in edges})
+    job_ids = sorted({job_id for _, job_id in edges}, key=str)
+    user_index = {user_id: i for i, user_id in enumerate(user_ids)}
+    job_index = {job_id: i for i, job_id in enumerate(job_ids)}
+
+    rows = np.fromiter((user_index[user_id] for user_id, _ in edges), dtype=np.int32, count=len(edges))
+    cols = np.fromiter((job_index[job_id] for _, job_id in edges), dtype=np.int32, count=len(edges))
+    matrix = sparse.csr_matrix((np.ones(len(edges), dtype=np.float32), (rows, cols)),
+                               shape=(len(user_ids), len(job_ids)))
+    matrix.data[:] = 1.0  # Duplicate edges are summed by the constructor
+    return matrix, user_ids, job_ids
+
+
+def item_similarity(matrix):
+    """Sparse job x job cosine similarity of co-saves, without self-similarity."""
+    col_norms = np.sqrt(np.asarray(matrix.sum(axis=0)).ravel())
+    col_norms[col_norms == 0] = 1.0
+    normalised = matrix @ sparse.diags(1.0 / col_norms)
+    similarity = (normalised.T @ normalised).tocsr()
+    similarity.setdiag(0)
+    similarity.eliminate_zeros()
+    return similarity
+
+
+def recommend(matrix, similarity, n=TOP_N):
+    """
+    Yield (row, column indexes, scores) with the top-n unsaved jobs for each user,
+    best first. Users are scored in blocks of USER_BLOCK_SIZE rows.
+    """
+    for start in range(0, matrix.shape[0], USER_BLOCK_SIZE):
+        block = matrix[start:start + USER_BLOCK_SIZE]
+        scores = (block @ similarity).tocsr()
+        # Drop jobs the user already saved
+        scores = scores - scores.multiply(block)
+        scores.eliminate_zeros()
+        for offset in range(scores.shape[0]):
+            row_start, row_end = scores.indptr[offset], scores.indptr[offset + 1]
+            if row_start == row_end:
+                continue
+            data = scores.data[row_start:row_end]
+            cols = scores.indices[row_start:row_end]
+            if len(data) > n:
+                top = np.argpartition(-data, n)[:n]
+                data, cols = data[top], cols[top]
+            order = np.argsort(-data, kind="stable")
+            yield start + offset, cols[order], data[order]
+
+
+def as_job_id(job_id):
+    """SAVED edges store job ids as strings; the jobs collection uses integer Job Ids."""
+    try:
+        return int(job_id)
+    except (TypeError, ValueError):
+        return job_id
+
+
+def run(neo4j, recommendations_collection, n=TOP_N):
+    """Export SAVED, score every user and replace the stored recommendations."""
+    generated_at = datetime.now()
+    edges = export_saved_edges(neo4j)
+    if not edges:
+        print("No SAVED relationships found. Nothing to recommend.")
+        return 0
+
+    matrix, user_ids, job_ids = build_matrix(edges)
+    print(f"Built {matrix.shape[0]} x {matrix.shape[1]} SAVED matrix with {matrix.nnz} entries.")
+    similarity = item_similarity(matrix)
+
+    recommendations_collection.create_index("user_id", unique=True, name="recommendations_user_index")
+    written = 0
+    requests = []
+    for row, cols, scores in recommend(matrix, similarity, n):
+        requests.append(ReplaceOne({"user_id": user_ids[row]}, {
+            "user_id": user_ids[row],
+            "job_ids": [as_job_id(job_ids[col]) for col in cols],
+            "scores": [round(float(score), 6) for score in scores],
+            "generated_at": generated_at,
+        }, upsert=True))
+        if len(requests) >= WRITE_BATCH_SIZE:
+            recommendations_collection.bulk_write(requests, ordered=False)
+            written += len(requests)
+            requests = []
+    if requests:
+        recommendations_collection.bulk_write(requests, ordered=False)
+        written += len(requests)
+
+    # Users with no recommendations this run should not keep stale ones
+    recommendations_collection.delete_many({"generated_at": {"$lt": generated_at}})
+    print(f"Stored recommendations for {written} users.")
+    return written
+
+
+if __name__ == "__main__":
+    from config import ATLAS_URI, DB_NAME
+
+    client = MongoClient(ATLAS_URI)
+    neo4j = Neo4jClient.from_config()
+    run(neo4j, client[DB_NAME]['recommendations'])
+    neo4j.close()
+    client.close()
@@ -0,0 +1,101 @@
+"""
+Lazily created, fork-safe database connections for the web app.
+
+Nothing connects at import time: the MongoDB client and the Neo4j client are
+created on first use in each process. Connection pools must not be shared across
+fork(), so a forked worker (e.g. gunicorn with --preload) forgets the handles it
+inherited from its parent and creates its own on first use.
+"""
+import os
+import threading
+import time
+from pymongo import MongoClient
+import config
+from neo4j_client import Neo4jClient
+
+# Fail fast when MongoDB is unreachable instead of pymongo's 30 second default
+MONGO_SERVER_SELECTION_TIMEOUT_MS = getattr(config, "MONGO_SERVER_SELECTION_TIMEOUT_MS", 5000)
+
+handles = {}
+handles_lock = threading.Lock()
+owner_pid = os.getpid()
+
+
+def reset_after_fork():
+    """Drop the parent's handles without closing them; closing would break the parent's sockets."""
+    global handles_lock, owner_pid
+    handles.clear()
+    handles_lock = threading.Lock()
+    owner_pid = os.getpid()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=reset_after_fork)
+
+
+def get_handle(name, factory):
+    if owner_pid != os.getpid():
+        reset_after_fork()
+    handle = handles.get(name)
+    if handle is None:
+        with handles_lock:
+            handle = handles.get(name)
+            if handle is None:
+                handle = handles[name] = factory()
+    return handle
+
+
+def get_mongo_client():
+    return get_handle("mongo", lambda: MongoClient(
+        config.ATLAS_URI, connect=False, serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS))
+
+
+def get_db():
+    return get_mongo_client()[config.DB_NAME]
+
+
+def get_neo4j():
+    """The process's shared Neo4jClient (one driver connection pool)."""
+    return get_handle("neo4j", Neo4jClient.from_config)
+
+
+def close_connections():
+    with handles_lock:
+        mongo_client = handles.pop("mongo", None)
+        neo4j_client = handles.pop("neo4j", None)
+    if mongo_client is not None:
+        mongo_client.close()
+    if neo4j_client is not None:
+        neo4j_client.close()
+
+
+class LazyHandle:
+    """
+    Module-level stand-in for a database object that is resolved on every use,
+    e.g. users_collection = LazyHandle(lambda: get_db()['users']).
+    """
+    def __init__(self, resolve):
+        self.resolve = resolve
+
+    def __getattr__(self, name):
+        return getattr(self.resolve(), name)
+
+    def __getitem__(self, key):
+        return self.resolve()[key]
+
+
+def check_health():
+    """Ping MongoDB and Neo4j. Returns {name: {"ok": bool, "latency_ms" or "error": ...}}."""
+    checks = {
+        "mongodb": lambda: get_mongo_client().admin.command("ping"),
+        "neo4j": lambda: get_neo4j().read("RETURN 1 AS ok", label="readiness"),
+    }
+    status = {}
+    for name, check in checks.items():
+        started = time.perf_counter()
+        try:
+            check()
+            status[name] = {"ok": True, "latency_ms": round((time.perf_counter() - started) * 1000, 1)}
+        except Exception as e:
+            status[name] = {"ok": False, "error": str(e)}
+    return status
@@ -0,0 +1,179 @@
+"""
+"Jobs near me": radius and k-nearest job search, ranked by distance.
+
+The primary path is a $geoNear aggregation over the `geo` GeoJSON point stored
+on each job (see job_fields.py) using the `job_geo_index` 2dsphere index. The
+salary overlap filter goes into the $geoNear query. $geoNear cannot be combined
+with $text, so a keyword search first collects the matching Job Ids from the
+text index and restricts $geoNear to them.
+
+When the 2dsphere index does not exist (setup-db not run yet), the same queries
+are answered by JobPointIndex: a scipy cKDTree over the jobs' coordinates as 3D
+unit vectors, where a great-circle radius is an exact chord-length radius.
+Candidates come out of the tree in distance order and the text and salary filters
+are then applied in MongoDB.
+"""
+import threading
+import numpy as np
+from pymongo.errors import OperationFailure
+from scipy.spatial import cKDTree
+
+EARTH_RADIUS_KM = 6371.0088
+
+# Most jobs returned by one query
+MAX_RESULTS = 100
+
+# Most text matches considered when a keyword is combined with a location
+TEXT_CANDIDATES = 1000
+
+RESULT_PROJECTION = {"_id": 0, "Job Id": 1, "Job Title": 1, "Company": 1, "location": 1, "Country": 1,
+                     "Salary Range": 1, "latitude": 1, "longitude": 1}
+
+
+def salary_filter(salary_min=None, salary_max=None):
+    """Jobs whose salary range overlaps [salary_min, salary_max] (either bound optional)."""
+    query = {}
+    if salary_max is not None:
+        query["salary_min"] = {"$lte": salary_max}
+    if salary_min is not None:
+        query["salary_max"] = {"$gte": salary_min}
+    return query
+
+
+def text_matches(jobs_collection, text):
+    """Job Ids of the best TEXT_CANDIDATES text-search matches."""
+    cursor = jobs_collection.find({"$text": {"$search": text}}, {"Job Id": 1, "score": {"$meta": "textScore"}})
+    cursor = cursor.sort([("score", {"$meta": "textScore"})]).limit(TEXT_CANDIDATES)
+    return [job["Job Id"] for job in cursor]
+
+
+def near_jobs(jobs_collection, latitude, longitude, radius_km=None, limit=20, text=None,
+              salary_min=None, salary_max=None, fallback_index=None):
+    """
+    Jobs ordered by distance from (latitude, longitude), each with a `distance_km`
+    field: all within radius_km (capped at `limit`), or the `limit` nearest if no
+    radius is given. `fallback_index` is used if the 2dsphere index is missing.
+    """
+    limit = max(1, min(limit, MAX_RESULTS))
+    query = salary_filter(salary_min, salary_max)
+    if text:
+        query["Job Id"] = {"$in": text_matches(jobs_collection, text)}
+
+    geo_near = {
+        "near": {"type": "Point", "coordinates": [longitude, latitude]},
+        "key": "geo",
+        "distanceField": "distance_m",
+        "spherical": True,
+        "query": query,
+    }
+    if radius_km is not None:
+        geo_near["maxDistance"] = radius_km * 1000
+    try:
+        jobs = list(jobs_collection.aggregate([
+            {"$geoNear": geo_near},
+            {"$limit": limit},
+            {"$project": {**RESULT_PROJECTION, "distance_m": 1}},
+        ]))
+    except OperationFailure as e:
+        if fallback_index is None:
+            raise
+        print(f"$geoNear unavailable, using the in-memory index: {e}")
+        return fallback_index.near(jobs_collection, latitude, longitude, radius_km, limit, query)
+
+    for job in jobs:
+        job["distance_km"] = round(job.pop("distance_m") / 1000, 2)
+    return jobs
+
+
+def to_unit_vectors(latitudes, longitudes):
+    lat, lon = np.radians(latitudes), np.radians(longitudes)
+    return np.column_stack((np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)))
+
+
+def chord_to_km(chord):
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.clip(chord / 2, 0, 1))
+
+
+def km_to_chord(km):
+    return 2 * np.sin(min(km / EARTH_RADIUS_KM, np.pi) / 2)
+
+
+class JobPointIndex:
+    """
+    In-memory KD-tree over every job's coordinates, rebuilt when the data version
+    passed to near() changes. Memory is about 32 bytes per job.
+    """
+    def __init__(self, version_source=None):
+        self.version_source = version_source
+        self.lock = threading.Lock()
+        self.version = None
+        self.tree = None
+        self.job_ids = None
+
+    def build(self, jobs_collection):
+        job_ids, latitudes, longitudes = [], [], []
+        for job in jobs_collection.find({}, {"_id": 0, "Job Id": 1, "latitude": 1, "longitude": 1}):
+            try:
+                latitude, longitude = float(job["latitude"]), float(job["longitude"])
+            except (KeyError, TypeError, ValueError):
+                continue
+            job_ids.append(job["Job Id"])
+            latitudes.append(latitude)
+            longitudes.append(longitude)
+        self.job_ids = np.array(job_ids, dtype=object)
+        self.tree = cKDTree(to_unit_vectors(latitudes, longitudes)) if job_ids else None
+        print(f"Built in-memory geo index over {len(job_ids)} jobs.")
+
+    def ensure_built(self, jobs_collection):
+        version = self.version_source() if self.version_source else None
+        with self.lock:
+            if self.tree is None or version != self.version:
+                self.build(jobs_collection)
+                self.version = version
+            return self.tree, self.job_ids
+
+    def near(self, jobs_collection, latitude, longitude, radius_km, limit, query):
+        """Same results as the $geoNear path: candidates in distance order, filtered by `query` in MongoDB."""
+        tree, job_ids = self.ensure_built(jobs_collection)
+        if tree is None:
+            return []
+        point = to_unit_vectors([latitude], [longitude])[0]
+        total = len(job_ids)
+
+        # Widen the nearest-neighbour search until enough candidates pass the filters
+        k = min(limit * 4, total)
+        while True:
+            chords, indexes = tree.query(point, k=k)
+            chords, indexes = np.atleast_1d(chords), np.atleast_1d(indexes)
+            if radius_km is not None:
+                within = chords <= km_to_chord(radius_km)
+                chords, indexes = chords[within], indexes[within]
+            jobs = self.fetch(jobs_collection, job_ids[indexes], chord_to_km(chords), query)
+            exhausted = k >= total or (radius_km is not None and len(indexes) < k)
+            if len(jobs) >= limit or exhausted:
+                return jobs[:limit]
+            k = min(k * 4, total)
+
+    @staticmethod
+    def fetch(jobs_collection, candidate_ids, distances_km, query):
+        distance_by_id = {}
+        for job_id, distance in zip(candidate_ids, distances_km):
+            distance_by_id.setdefault(job_id, float(distance))
+        # $and keeps a text-match restriction on "Job Id" already in `query`
+        jobs = list(jobs_collection.find({"$and": [query, {"Job Id": {"$in": list(distance_by_id)}}]},
+                                         RESULT_PROJECTION))
+        for job in jobs:
+            job["distance_km"] = round(distance_by_id[job["Job Id"]], 2)
+        jobs.sort(key=lambda job: job["distance_km"])
+        return jobs
+
+
+def city_center(jobs_collection, city):
+    """Mean coordinates of the jobs in a city (the `location` field), or None if there are none."""
+    result = list(jobs_collection.aggregate([
+        {"$match": {"location": city}},
+        {"$group": {"_id": None, "latitude": {"$avg": "$latitude"}, "longitude": {"$avg": "$longitude"}}},
+    ]))
+    if not result or result[0]["latitude"] is None:
+        return None
+    return result[0]["latitude"], result[0]["longitude"]
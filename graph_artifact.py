@@ -0,0 +1,185 @@
+"""
+Interactive Company -> Job -> Skill graph shown on the Insights page.
+
+The pyvis HTML is a cached artifact in static/. It is keyed by a graph version
+stamp (node and relationship counts, which Neo4j reads from its count store, plus
+an optional external stamp such as the importers' data version) and regenerated
+only when that version changes. Generation runs in a background thread or on
+demand (`python graph_artifact.py [--force]`), and the file is replaced
+atomically, so the app always serves the last good artifact.
+"""
+import argparse
+import os
+import threading
+import uuid
+from pyvis.network import Network
+from neo4j_client import Neo4jClient
+
+GRAPH_HTML_PATH = os.path.join("static", "interactive_graph.html")
+GRAPH_VERSION_PATH = os.path.join("static", "interactive_graph.version")
+
+# Seconds between graph version checks in the background thread
+REFRESH_INTERVAL_SECONDS = 300
+
+refresh_lock = threading.Lock()
+
+
+def graph_version(neo4j, extra_version=None):
+    """Version stamp of the data the artifact is built from."""
+    # Each count in its own subquery, so an empty label or relationship type still yields one row
+    counts = neo4j.read("""
+        CALL { MATCH (c:Company) RETURN count(c) AS companies }
+        CALL { MATCH (j:Job) RETURN count(j) AS jobs }
+        CALL { MATCH (s:Skill) RETURN count(s) AS skills }
+        CALL { MATCH ()-[p:POSTED_BY]->() RETURN count(p) AS posted_by }
+        CALL { MATCH ()-[r:REQUIRES_SKILL]->() RETURN count(r) AS requires_skill }
+        RETURN companies, jobs, skills, posted_by, requires_skill
+    """, label="graph_artifact_version")[0]
+    version = "-".join(str(counts[key]) for key in
+                       ("companies", "jobs", "skills", "posted_by", "requires_skill"))
+    if extra_version is not None:
+        version = f"{version}-{extra_version}"
+    return version
+
+
+def artifact_exists():
+    return os.path.exists(GRAPH_HTML_PATH)
+
+
+def artifact_version():
+    try:
+        with open(GRAPH_VERSION_PATH, encoding="utf-8") as version_file:
+            return version_file.read().strip()
+    except FileNotFoundError:
+        return None
+
+
+def generate_graph(neo4j, output_path=GRAPH_HTML_PATH):
+    net = Network(notebook=False, height="600px", width="100%", bgcolor="#ffffff", font_color="black")
+
+    # Query Neo4j for Company -> Job -> Skill relationships
+    rows = neo4j.read("""
+        MATCH (j:Job)-[:POSTED_BY]->(c:Company)
+        OPTIONAL MATCH (j)-[:REQUIRES_SKILL]->(s:Skill)
+        RETURN elementId(c) AS company_id, c.name AS company_name,
+               elementId(j) AS job_node_id, j.job_id AS job_id, j.title AS job_title,
+               j.role AS role, j.location AS location,
+               elementId(s) AS skill_id, s.name AS skill_name
+        LIMIT 100
+    """, label="graph_artifact_edges")
+
+    for row in rows:
+        company_id = row["company_id"]
+        job_id = row["job_node_id"]
+        skill_id = row["skill_id"]
+
+        # Add Company node
+        if company_id:
+            company_name = row["company_name"] or "Unknown Company"
+            net.add_node(
+                company_id,
+                label=f"Company: {company_name}",
+                title=f"Company: {company_name}",
+                color="green"
+            )
+        # Add Job node
+        if job_id:
+            job_title = row["job_title"] or "Unknown Job"
+            role = row["role"] or "Unknown Role"
+            net.add_node(
+                job_id,
+                label=f"Job: {job_title}",
+                title=(
+                    f"Job ID: {row['job_id'] or 'N/A'}\n"
+                    f"Role: {role}\n"
+                    f"Location: {row['location'] or 'N/A'}"
+                ),
+                color="red"
+            )
+            # Connect Job to Company
+            if company_id:
+                net.add_edge(company_id, job_id, title="POSTED_BY")
+
+        # Add Skill node and connect it to Job
+        if skill_id:
+            skill_name = row["skill_name"] or "Unknown Skill"
+            net.add_node(
+                skill_id,
+                label=f"Skill: {skill_name}",
+                title=f"Skill: {skill_name}",
+                color="blue"
+            )
+            net.add_edge(job_id, skill_id, title="REQUIRES_SKILL")
+
+    # Write next to the artifact, then swap it in so readers never see a partial file
+    temp_path = unique_temp_path(output_path[:-len(".html")], ".html")
+    net.save_graph(temp_path)
+    os.replace(temp_path, output_path)
+
+
+def refresh_graph_artifact(neo4j, force=False, extra_version=None):
+    """Regenerate the artifact if the graph version changed. Returns True if it was regenerated."""
+    with refresh_lock:
+        version = graph_version(neo4j, extra_version)
+        if not force and artifact_exists() and artifact_version() == version:
+            return False
+        generate_graph(neo4j)
+
+        temp_path = unique_temp_path(GRAPH_VERSION_PATH)
+        with open(temp_path, "w", encoding="utf-8") as version_file:
+            version_file.write(version)
+        os.replace(temp_path, GRAPH_VERSION_PATH)
+        print(f"Regenerated graph artifact (version {version}).")
+        return True
+
+
+def unique_temp_path(base_path, suffix=""):
+    """Temp file next to base_path; every app worker runs its own refresher, so names must not collide."""
+    return f"{base_path}.{os.getpid()}.{uuid.uuid4().hex}.tmp{suffix}"
+
+
+def resolve(extra_version):
+    return extra_version() if callable(extra_version) else extra_version
+
+
+def refresh_in_background(neo4j, force=False, extra_version=None):
+    """Run one refresh in a daemon thread; returns False if a refresh is already running."""
+    if refresh_lock.locked():
+        return False
+
+    def run():
+        try:
+            refresh_graph_artifact(neo4j, force, resolve(extra_version))
+        except Exception as e:
+            print(f"Error refreshing graph artifact: {e}")
+
+    threading.Thread(target=run, name="graph-artifact-refresh", daemon=True).start()
+    return True
+
+
+def start_background_refresh(neo4j, interval=REFRESH_INTERVAL_SECONDS, extra_version=None):
+    """Check the graph version now and then every `interval` seconds in a daemon thread."""
+    stop = threading.Event()
+
+    def run():
+        while True:
+            try:
+                refresh_graph_artifact(neo4j, extra_version=resolve(extra_version))
+            except Exception as e:
+                print(f"Error refreshing graph artifact: {e}")
+            if stop.wait(interval):
+                return
+
+    threading.Thread(target=run, name="graph-artifact-refresher", daemon=True).start()
+    return stop
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Regenerate the interactive graph artifact if the graph changed.")
+    parser.add_argument("--force", action="store_true", help="Regenerate even if the version is unchanged")
+    args = parser.parse_args()
+
+    neo4j = Neo4jClient.from_config()
+    if not refresh_graph_artifact(neo4j, force=args.force):
+        print("Graph artifact is up to date.")
+    neo4j.close()
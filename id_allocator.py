@@ -0,0 +1,63 @@
+"""
+Block-based ID allocation from an atomic counter document.
+
+The `counters` collection holds one document per sequence, e.g.
+{"_id": "user_id", "value": 1200}. An allocator reserves `block_size` IDs at a
+time with a single find_one_and_update($inc), then hands them out from memory,
+so only one signup in `block_size` makes the extra round trip. Concurrent
+processes always receive disjoint blocks. IDs left in a block when a process
+exits are skipped, so IDs are unique and increasing per process but not gapless.
+
+Before its first reservation an allocator raises the counter to the largest ID
+already in use ($max, so the counter never moves backwards). The same happens
+after resync(), which callers use when the unique index reports that an ID was
+taken by a writer that bypassed the counter (e.g. mock_users.py).
+"""
+import threading
+from pymongo import ReturnDocument
+
+
+class IdBlockAllocator:
+    def __init__(self, counters_collection, name, block_size, current_max=None):
+        """`current_max` returns the largest ID already in use (or None), used to seed the counter."""
+        self.counters = counters_collection
+        self.name = name
+        self.block_size = block_size
+        self.current_max = current_max
+        self.lock = threading.Lock()
+        self.next_id = None
+        self.block_end = None
+        self.seeded = False
+
+    def allocate(self):
+        with self.lock:
+            if self.next_id is None or self.next_id > self.block_end:
+                self.reserve_block()
+            allocated = self.next_id
+            self.next_id += 1
+            return allocated
+
+    def reserve_block(self):
+        if not self.seeded:
+            self.seed()
+        counter = self.counters.find_one_and_update(
+            {"_id": self.name},
+            {"$inc": {"value": self.block_size}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        self.block_end = counter["value"]
+        self.next_id = counter["value"] - self.block_size + 1
+
+    def seed(self):
+        in_use = self.current_max() if self.current_max else None
+        if in_use is not None:
+            self.counters.update_one({"_id": self.name}, {"$max": {"value": in_use}}, upsert=True)
+        self.seeded = True
+
+    def resync(self):
+        """Drop the current block and re-seed from the IDs in use before the next reservation."""
+        with self.lock:
+            self.next_id = None
+            self.block_end = None
+            self.seeded = False
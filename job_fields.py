@@ -0,0 +1,76 @@
+"""
+Derived fields stored on job documents at ingest, so queries can filter and
+aggregate on them instead of parsing the raw CSV strings per request.
+
+    salary_min, salary_max  integers parsed from "Salary Range"
+    geo                     GeoJSON Point from latitude/longitude (2dsphere index)
+
+Also holds the parsing of raw fields shared by the importers and the app, such
+as splitting the `skills` text into individual skills and the role names stored
+on Neo4j Job nodes.
+"""
+import re
+
+# Fields computed by derived_fields() and the raw fields they are computed from
+DERIVED_FIELDS = ["salary_min", "salary_max", "geo"]
+SOURCE_FIELDS = ["Salary Range", "latitude", "longitude"]
+
+
+def extract_numeric_salary(salary_range):
+    """Extract min and max salary from a string like '$58K–$104K'."""
+    if not salary_range or not isinstance(salary_range, str):
+        return None, None
+
+    try:
+        # Use regex to find all numbers in the salary range
+        salary_values = re.findall(r'\d+', salary_range)
+        if len(salary_values) == 2:
+            min_salary = int(salary_values[0]) * 1000  # Convert to full numbers
+            max_salary = int(salary_values[1]) * 1000
+            return min_salary, max_salary
+    except Exception as e:
+        print(f"Error parsing salary range: {e}")
+
+    return None, None
+
+
+def salary_fields(job):
+    """Integer salary_min/salary_max for a job document, parsed from 'Salary Range'."""
+    salary_min, salary_max = extract_numeric_salary(job.get("Salary Range"))
+    return {"salary_min": salary_min, "salary_max": salary_max}
+
+
+def geo_point(latitude, longitude):
+    """GeoJSON Point (longitude first) for valid coordinates, else None."""
+    try:
+        latitude, longitude = float(latitude), float(longitude)
+    except (TypeError, ValueError):
+        return None
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        return None
+    return {"type": "Point", "coordinates": [longitude, latitude]}
+
+
+def geo_fields(job):
+    """`geo` point for a job document; None (not indexed by 2dsphere) if it has no valid coordinates."""
+    return {"geo": geo_point(job.get("latitude"), job.get("longitude"))}
+
+
+def derived_fields(job):
+    """All derived fields for a job document."""
+    return {**salary_fields(job), **geo_fields(job)}
+
+
+def clean_and_split_skills(skills_text):
+    """Clean the skills text and split into individual skills."""
+    if not isinstance(skills_text, str) or not skills_text.strip():
+        return []
+    skills_text = re.sub(r"\(.*?\)", "", skills_text)  # Remove text in parentheses
+    return [skill.strip() for skill in re.split(r",| and ", skills_text) if skill.strip()]
+
+
+def standardize_role(role_text):
+    """Standardize job roles by removing unnecessary words."""
+    if not isinstance(role_text, str):
+        return role_text
+    return re.sub(r"[^a-zA-Z0-9\s]", "", role_text).strip()
@@ -0,0 +1,89 @@
+"""
+In-process metrics registry, served as JSON by the app's /metrics endpoint.
+
+Three kinds of metric:
+    timers    latency (and optional row counts) per name, e.g. one per Neo4j query
+    counters  monotonically increasing totals, e.g. cache hits
+    gauges    callables read when the snapshot is taken, e.g. a queue length
+Timers keep the last TIMER_WINDOW observations for the p50/p95 latencies.
+"""
+from collections import Counter, deque
+import threading
+
+# Number of recent observations kept per timer for percentiles
+TIMER_WINDOW = 1024
+
+
+class Timer:
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.rows = 0
+        self.recent = deque(maxlen=TIMER_WINDOW)
+
+    def observe(self, seconds, rows=0, error=False):
+        self.count += 1
+        self.errors += int(error)
+        self.total_seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+        self.rows += rows
+        self.recent.append(seconds)
+
+    def snapshot(self):
+        recent = sorted(self.recent)
+
+        def percentile(fraction):
+            return round(recent[min(len(recent) - 1, int(fraction * len(recent)))] * 1000, 2) if recent else 0.0
+
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "rows": self.rows,
+            "avg_ms": round(self.total_seconds / self.count * 1000, 2) if self.count else 0.0,
+            "p50_ms": percentile(0.5),
+            "p95_ms": percentile(0.95),
+            "max_ms": round(self.max_seconds * 1000, 2),
+        }
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.timers = {}
+        self.counters = Counter()
+        self.gauges = {}
+
+    def observe(self, name, seconds, rows=0, error=False):
+        with self.lock:
+            timer = self.timers.get(name)
+            if timer is None:
+                timer = self.timers[name] = Timer()
+            timer.observe(seconds, rows, error)
+
+    def incr(self, name, value=1):
+        with self.lock:
+            self.counters[name] += value
+
+    def gauge(self, name, read):
+        """Register a callable whose value is read at snapshot time."""
+        with self.lock:
+            self.gauges[name] = read
+
+    def snapshot(self):
+        with self.lock:
+            timers = {name: timer.snapshot() for name, timer in sorted(self.timers.items())}
+            counters = dict(sorted(self.counters.items()))
+            gauges = dict(sorted(self.gauges.items()))
+        gauge_values = {}
+        for name, read in gauges.items():
+            try:
+                gauge_values[name] = read()
+            except Exception as e:
+                gauge_values[name] = {"error": str(e)}
+        return {"timers": timers, "counters": counters, "gauges": gauge_values}
+
+
+# Process-wide registry shared by the app and its helpers
+registry = MetricsRegistry()
@@ -0,0 +1,97 @@
+from pymongo import MongoClient, UpdateOne
+import argparse
+import csv
+from config import ATLAS_URI, DB_NAME
+from job_fields import DERIVED_FIELDS, SOURCE_FIELDS, derived_fields
+from result_cache import bump_data_version
+from search_backends import update_saved_index
+import analytics_rollups
+
+# File path for jobs CSV file
+CSV_FILE_PATH = "jobs_filtered_sampled.csv"
+
+# Number of documents inserted or updated per bulk request
+BATCH_SIZE = 1000
+
+# Columns that mongoimport would have stored as numbers
+NUMERIC_FIELDS = {"Job Id": int, "latitude": float, "longitude": float}
+
+
+def parse_row(row):
+    """Convert a CSV row into a job document, including the derived fields."""
+    job = dict(row)
+    for field, convert in NUMERIC_FIELDS.items():
+        try:
+            job[field] = convert(job[field])
+        except (KeyError, TypeError, ValueError):
+            pass
+    job.update(derived_fields(job))
+    return job
+
+
+def import_jobs(jobs_collection, csv_file_path, batch_size=BATCH_SIZE, rollups_collection=None):
+    """
+    Insert the jobs from a CSV file with their derived fields (replaces mongoimport).
+    When `rollups_collection` is given, the analytics rollups are updated per batch.
+    """
+    imported = 0
+    with open(csv_file_path, 'r', encoding='utf-8') as csv_file:
+        batch = []
+        for row in csv.DictReader(csv_file):
+            batch.append(parse_row(row))
+            if len(batch) >= batch_size:
+                insert_batch(jobs_collection, batch, rollups_collection)
+                imported += len(batch)
+                batch = []
+                print(f"Imported {imported} jobs...")
+        if batch:
+            insert_batch(jobs_collection, batch, rollups_collection)
+            imported += len(batch)
+    print(f"Imported {imported} jobs from {csv_file_path}.")
+    return imported
+
+
+def insert_batch(jobs_collection, batch, rollups_collection=None):
+    jobs_collection.insert_many(batch, ordered=False)
+    if rollups_collection is not None:
+        analytics_rollups.record_jobs_added(rollups_collection, batch)
+
+
+def backfill_derived_fields(jobs_collection, batch_size=BATCH_SIZE):
+    """Migration: compute the derived fields for existing documents that are missing them."""
+    missing = {"$or": [{field: {"$exists": False}} for field in DERIVED_FIELDS]}
+    projection = {field: 1 for field in SOURCE_FIELDS}
+
+    updated = 0
+    requests = []
+    for job in jobs_collection.find(missing, projection):
+        requests.append(UpdateOne({"_id": job["_id"]}, {"$set": derived_fields(job)}))
+        if len(requests) >= batch_size:
+            updated += jobs_collection.bulk_write(requests, ordered=False).modified_count
+            requests = []
+            print(f"Backfilled {updated} jobs...")
+    if requests:
+        updated += jobs_collection.bulk_write(requests, ordered=False).modified_count
+    print(f"Backfilled derived fields on {updated} jobs.")
+    return updated
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import jobs into MongoDB or backfill derived fields.")
+    parser.add_argument("csv_file", nargs="?", default=CSV_FILE_PATH, help="Path to the jobs CSV file")
+    parser.add_argument("--backfill", action="store_true",
+                        help="Add derived fields to jobs already in the collection instead of importing")
+    args = parser.parse_args()
+
+    client = MongoClient(ATLAS_URI)
+    db = client[DB_NAME]
+    if args.backfill:
+        backfill_derived_fields(db['jobs'])
+        # Salary sums depend on the backfilled fields, so recompute the rollups
+        analytics_rollups.rebuild(db)
+    else:
+        import_jobs(db['jobs'], args.csv_file, rollups_collection=db['analytics_rollups'])
+        # Saved BM25 search index, so restarted apps map it without catching up
+        update_saved_index(db['jobs'])
+    bump_data_version(db, "mongodb_JobImport")
+    client.close()
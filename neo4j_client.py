@@ -0,0 +1,94 @@
+"""
+Shared Neo4j access layer.
+
+One Neo4jClient wraps one neo4j driver, i.e. one connection pool (size and
+acquisition timeout come from config). Every query runs in a managed read or
+write transaction, so with a neo4j:// URI reads are routed to read replicas and
+transient errors are retried by the driver. Each query is timed and its row
+count recorded in the metrics registry under "neo4j.<label>".
+
+    neo4j = Neo4jClient.from_config()
+    rows = neo4j.read("MATCH (s:Skill) RETURN s.name AS name LIMIT $n", n=10, label="skills")
+"""
+import re
+import time
+from neo4j import GraphDatabase, READ_ACCESS, WRITE_ACCESS
+import config
+from metrics import registry
+
+# Connections kept in the pool, shared by all threads of a process
+MAX_CONNECTION_POOL_SIZE = getattr(config, "NEO4J_MAX_CONNECTION_POOL_SIZE", 50)
+
+# Seconds to wait for a free pooled connection before failing
+CONNECTION_ACQUISITION_TIMEOUT = getattr(config, "NEO4J_CONNECTION_ACQUISITION_TIMEOUT", 60)
+
+# Database name; None uses the server's default database
+DATABASE = getattr(config, "NEO4J_DATABASE", None)
+
+
+def query_label(query):
+    """Default metrics label: the first 60 characters of the query on one line."""
+    return re.sub(r"\s+", " ", query).strip()[:60]
+
+
+class Neo4jClient:
+    def __init__(self, uri, user, password, max_connection_pool_size=MAX_CONNECTION_POOL_SIZE,
+                 connection_acquisition_timeout=CONNECTION_ACQUISITION_TIMEOUT, database=DATABASE,
+                 metrics=registry):
+        self.driver = GraphDatabase.driver(
+            uri, auth=(user, password),
+            max_connection_pool_size=max_connection_pool_size,
+            connection_acquisition_timeout=connection_acquisition_timeout,
+        )
+        self.database = database
+        self.metrics = metrics
+
+    @classmethod
+    def from_config(cls, **kwargs):
+        return cls(config.NEO4J_URI, config.NEO4J_USER, config.NEO4J_PASSWORD, **kwargs)
+
+    def close(self):
+        self.driver.close()
+
+    def session(self, access_mode=WRITE_ACCESS):
+        return self.driver.session(database=self.database, default_access_mode=access_mode)
+
+    def execute(self, access_mode, work, *args, label=None, **kwargs):
+        """Run a transaction function and record its latency (and rows, if it returns a list)."""
+        started = time.perf_counter()
+        result = None
+        error = False
+        try:
+            with self.session(access_mode) as session:
+                if access_mode == READ_ACCESS:
+                    result = session.execute_read(work, *args, **kwargs)
+                else:
+                    result = session.execute_write(work, *args, **kwargs)
+            return result
+        except Exception:
+            error = True
+            raise
+        finally:
+            rows = len(result) if isinstance(result, list) else 0
+            self.metrics.observe(f"neo4j.{label or work.__name__}", time.perf_counter() - started,
+                                 rows, error)
+
+    def execute_read(self, work, *args, label=None, **kwargs):
+        return self.execute(READ_ACCESS, work, *args, label=label, **kwargs)
+
+    def execute_write(self, work, *args, label=None, **kwargs):
+        return self.execute(WRITE_ACCESS, work, *args, label=label, **kwargs)
+
+    def read(self, query, parameters=None, label=None, **kwparameters):
+        """Run a query in a read transaction and return its rows as dicts."""
+        return self.execute(READ_ACCESS, fetch_rows, query, {**(parameters or {}), **kwparameters},
+                            label=label or query_label(query))
+
+    def write(self, query, parameters=None, label=None, **kwparameters):
+        """Run a query in a write transaction and return its rows as dicts."""
+        return self.execute(WRITE_ACCESS, fetch_rows, query, {**(parameters or {}), **kwparameters},
+                            label=label or query_label(query))
+
+
+def fetch_rows(tx, query, parameters):
+    return tx.run(query, parameters).data()
@@ -0,0 +1,260 @@
+"""
+Write-behind outbox for the Neo4j side of save_job/remove_job.
+
+The request only writes to MongoDB, in one atomic update of the user document:
+the saved_jobs change plus an event appended to the document's `neo4j_outbox`
+array, {"id", "op": "save" | "unsave", "job_id", "refresh_similar": bool,
+"created_at"}. An event therefore exists exactly when its change was committed,
+and a user's events are in the order their updates were applied (updates to one
+document are serialised). Events of different users touch different SAVED
+edges, so they need no common order.
+
+A background flusher drains the users with pending events: each batch is
+collapsed to the last operation per (user, job), written with two UNWIND
+queries in one Neo4j transaction, followed by the SIMILAR_USER refreshes the
+events asked for, and only then pulled from the user documents by id (events
+appended meanwhile stay for the next batch). A failed batch is retried (with
+capped exponential backoff); all writes are idempotent, so a batch replayed
+after a crash is harmless. Only the process holding the lease document
+(outbox_leases) flushes, so several app workers can run a flusher safely. The
+lease is renewed around the Neo4j write and after each refresh; a flusher that
+lost it stops without writing to Neo4j or pulling its events, and the new holder
+replays them in order, so a flusher that stalled past its lease does not keep
+racing the new holder.
+
+`python neo4j_outbox.py` drains the outbox once from the command line.
+"""
+from datetime import datetime, timedelta
+import os
+import socket
+import threading
+import time
+import uuid
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError
+from metrics import registry
+from user_similarity import refresh_user
+
+# Array of pending events on each user document
+OUTBOX_FIELD = "neo4j_outbox"
+
+# Document in outbox_leases naming the process allowed to flush
+LEASE_ID = "neo4j_outbox"
+
+# Users whose pending events are applied per Neo4j transaction
+FLUSH_BATCH_SIZE = 500
+
+# Seconds between polls of an empty outbox
+POLL_INTERVAL_SECONDS = 1.0
+
+# Seconds a flusher holds the lease without renewing it
+LEASE_SECONDS = 30
+
+# Longest wait between retries of a failing batch
+MAX_BACKOFF_SECONDS = 60
+
+PENDING_QUERY = {f"{OUTBOX_FIELD}.id": {"$exists": True}}
+NO_SAVED_JOBS = {"$or": [{"user_job_preferences.saved_jobs": {"$size": 0}},
+                         {"user_job_preferences.saved_jobs": {"$exists": False}}]}
+
+
+def outbox_event(op, job_id, refresh_similar):
+    return {"id": uuid.uuid4().hex, "op": op, "job_id": job_id,
+            "refresh_similar": refresh_similar, "created_at": datetime.now()}
+
+
+def record_save(users_collection, user_id, job_id):
+    """
+    Add a job to the user's saved jobs together with its outbox event. Returns False if the
+    job was already saved (nothing is recorded). A user's first saved job makes them eligible
+    as a neighbour for others, so that event asks for a SIMILAR_USER refresh.
+    """
+    not_saved = {"user_job_preferences.saved_jobs": {"$ne": job_id}}
+    for first_save, condition in ((True, NO_SAVED_JOBS), (False, not_saved)):
+        result = users_collection.update_one({"user.user_id": user_id, **condition}, {"$push": {
+            "user_job_preferences.saved_jobs": job_id,
+            OUTBOX_FIELD: outbox_event("save", job_id, refresh_similar=first_save),
+        }})
+        if result.modified_count:
+            return True
+    return False
+
+
+def record_unsave(users_collection, user_id, job_id):
+    """
+    Remove a job from the user's saved jobs together with its outbox event. Returns whether the
+    job was saved, or None if there is no such user. Users left without saved jobs are dropped
+    from other users' neighbour lists, so removing the last one asks for a SIMILAR_USER refresh.
+    """
+    result = users_collection.update_one({"user.user_id": user_id, "user_job_preferences.saved_jobs": [job_id]}, {
+        "$pull": {"user_job_preferences.saved_jobs": job_id},
+        "$push": {OUTBOX_FIELD: outbox_event("unsave", job_id, refresh_similar=True)},
+    })
+    if result.modified_count:
+        return True
+    user = users_collection.find_one_and_update({"user.user_id": user_id}, {
+        "$pull": {"user_job_preferences.saved_jobs": job_id},
+        "$push": {OUTBOX_FIELD: outbox_event("unsave", job_id, refresh_similar=False)},
+    }, projection={"user_job_preferences.saved_jobs": 1}, return_document=ReturnDocument.BEFORE)
+    if user is None:
+        return None
+    return job_id in user.get("user_job_preferences", {}).get("saved_jobs", [])
+
+
+def outbox_status(db):
+    """Backlog size and age of the oldest pending event (for /metrics)."""
+    rows = list(db['users'].aggregate([
+        {"$match": PENDING_QUERY},
+        {"$unwind": f"${OUTBOX_FIELD}"},
+        {"$group": {"_id": None, "backlog": {"$sum": 1}, "oldest": {"$min": f"${OUTBOX_FIELD}.created_at"}}},
+    ]))
+    backlog = rows[0]["backlog"] if rows else 0
+    oldest = rows[0]["oldest"] if rows else None
+    return {
+        "backlog": backlog,
+        "lag_seconds": round((datetime.now() - oldest).total_seconds(), 1) if oldest else 0.0,
+    }
+
+
+def collapse(events):
+    """Last operation per (user, job) in event order, plus the users whose neighbours need refreshing."""
+    latest = {}
+    refresh_users = []
+    for event in events:
+        latest[(event["user_id"], event["job_id"])] = event["op"]
+        if event.get("refresh_similar") and event["user_id"] not in refresh_users:
+            refresh_users.append(event["user_id"])
+    saves = [{"user_id": user_id, "job_id": job_id} for (user_id, job_id), op in latest.items() if op == "save"]
+    unsaves = [{"user_id": user_id, "job_id": job_id} for (user_id, job_id), op in latest.items() if op == "unsave"]
+    return saves, unsaves, refresh_users
+
+
+def write_saved_edges(tx, saves, unsaves):
+    tx.run("""
+        UNWIND $rows AS row
+        MERGE (u:User {user_id: row.user_id})
+        MERGE (j:Job {job_id: row.job_id})
+        MERGE (u)-[:SAVED]->(j)
+    """, rows=saves)
+    tx.run("""
+        UNWIND $rows AS row
+        MATCH (u:User {user_id: row.user_id})-[r:SAVED]->(j:Job {job_id: row.job_id})
+        DELETE r
+    """, rows=unsaves)
+    return len(saves) + len(unsaves)
+
+
+class OutboxFlusher:
+    def __init__(self, db, neo4j, batch_size=FLUSH_BATCH_SIZE, poll_interval=POLL_INTERVAL_SECONDS,
+                 lease_seconds=LEASE_SECONDS, metrics=registry):
+        self.db = db
+        self.neo4j = neo4j
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.metrics = metrics
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+    def acquire_lease(self):
+        """Take or renew the flush lease; False while another live flusher holds it."""
+        now = datetime.now()
+        try:
+            self.db['outbox_leases'].find_one_and_update(
+                {"_id": LEASE_ID, "$or": [{"owner": self.owner}, {"expires_at": {"$lt": now}}]},
+                {"$set": {"owner": self.owner, "expires_at": now + timedelta(seconds=self.lease_seconds)}},
+                upsert=True
+            )
+            return True
+        except DuplicateKeyError:
+            return False  # The lease document exists and belongs to someone else
+
+    def renew_lease(self):
+        """Extend the lease mid-batch; False (counted in /metrics) if another flusher took it over."""
+        if self.acquire_lease():
+            return True
+        self.metrics.incr("outbox.lease_lost")
+        return False
+
+    def flush_batch(self):
+        """Apply the pending events of a batch of users to Neo4j and remove them. Returns the number of events flushed."""
+        users = self.db['users']
+        pending = list(users.find(PENDING_QUERY, {"user.user_id": 1, OUTBOX_FIELD: 1}).limit(self.batch_size))
+        events = [dict(event, user_id=user["user"]["user_id"]) for user in pending for event in user[OUTBOX_FIELD]]
+        if not events:
+            return 0
+
+        if not self.apply(events):
+            return 0
+        users.bulk_write([
+            UpdateOne({"_id": user["_id"]},
+                      {"$pull": {OUTBOX_FIELD: {"id": {"$in": [event["id"] for event in user[OUTBOX_FIELD]]}}}})
+            for user in pending
+        ], ordered=False)
+        return len(events)
+
+    def apply(self, events):
+        """
+        Write a batch of events (each user's in order) to Neo4j. Returns False if the lease was
+        lost on the way; the events must then stay in the outbox for the new lease holder.
+        """
+        started = time.perf_counter()
+        saves, unsaves, refresh_users = collapse(events)
+        if not self.renew_lease():
+            return False
+        self.neo4j.execute_write(write_saved_edges, saves, unsaves, label="outbox_saved_edges")
+        if not self.renew_lease():
+            return False
+        for user_id in refresh_users:
+            refresh_user(self.db['users'], self.neo4j, user_id)
+            if not self.renew_lease():
+                return False
+
+        self.metrics.observe("outbox.flush", time.perf_counter() - started, rows=len(events))
+        self.metrics.incr("outbox.flushed", len(events))
+        return True
+
+    def drain(self):
+        """Flush until the outbox is empty (command-line use). Returns the number of events flushed."""
+        total = 0
+        while self.acquire_lease():
+            flushed = self.flush_batch()
+            if not flushed:
+                break
+            total += flushed
+        return total
+
+    def run(self, stop):
+        failures = 0
+        while not stop.is_set():
+            try:
+                flushed = self.flush_batch() if self.acquire_lease() else 0
+                failures = 0
+            except Exception as e:
+                failures += 1
+                self.metrics.incr("outbox.flush_errors")
+                delay = min(self.poll_interval * 2 ** failures, MAX_BACKOFF_SECONDS)
+                print(f"Error flushing Neo4j outbox (attempt {failures}, retrying in {delay:.0f}s): {e}")
+                stop.wait(delay)
+                continue
+            if not flushed:
+                stop.wait(self.poll_interval)
+
+    def start(self):
+        """Run the flusher in a daemon thread; set the returned event to stop it."""
+        stop = threading.Event()
+        threading.Thread(target=self.run, args=(stop,), name="neo4j-outbox-flusher", daemon=True).start()
+        return stop
+
+
+if __name__ == "__main__":
+    from pymongo import MongoClient
+    from config import ATLAS_URI, DB_NAME
+    from neo4j_client import Neo4jClient
+
+    client = MongoClient(ATLAS_URI)
+    neo4j = Neo4jClient.from_config()
+    db = client[DB_NAME]
+    flushed = OutboxFlusher(db, neo4j).drain()
+    print(f"Flushed {flushed} outbox events; {outbox_status(db)['backlog']} left.")
+    neo4j.close()
+    client.close()
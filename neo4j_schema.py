@@ -0,0 +1,67 @@
+"""
+Neo4j constraints and indexes backing the MERGE/MATCH lookups in the importers and app.py.
+
+Every statement uses IF NOT EXISTS, so running the setup repeatedly is safe.
+"""
+
+# (name, statement) pairs. Uniqueness constraints also create the index that MERGE uses.
+SCHEMA_STATEMENTS = [
+    ("job_id_unique",
+     "CREATE CONSTRAINT job_id_unique IF NOT EXISTS FOR (j:Job) REQUIRE j.job_id IS UNIQUE"),
+    ("company_name_unique",
+     "CREATE CONSTRAINT company_name_unique IF NOT EXISTS FOR (c:Company) REQUIRE c.name IS UNIQUE"),
+    ("skill_name_unique",
+     "CREATE CONSTRAINT skill_name_unique IF NOT EXISTS FOR (s:Skill) REQUIRE s.name IS UNIQUE"),
+    ("role_name_unique",
+     "CREATE CONSTRAINT role_name_unique IF NOT EXISTS FOR (r:Role) REQUIRE r.name IS UNIQUE"),
+    ("user_id_unique",
+     "CREATE CONSTRAINT user_id_unique IF NOT EXISTS FOR (u:User) REQUIRE u.user_id IS UNIQUE"),
+    ("dataset_file_path_unique",
+     "CREATE CONSTRAINT dataset_file_path_unique IF NOT EXISTS FOR (d:Dataset) REQUIRE d.file_path IS UNIQUE"),
+    ("responsibility_description_index",
+     "CREATE INDEX responsibility_description_index IF NOT EXISTS FOR (r:Responsibility) ON (r.description)"),
+    ("location_city_country_index",
+     "CREATE INDEX location_city_country_index IF NOT EXISTS FOR (l:Location) ON (l.city, l.country)"),
+]
+
+# Seconds to wait for newly created indexes to finish populating
+INDEX_WAIT_SECONDS = 300
+
+
+def setup_neo4j_schema(neo4j, wait_seconds=INDEX_WAIT_SECONDS):
+    """
+    Sets up the Neo4j constraints and indexes (through a Neo4jClient) and reports their state.
+    Returns a dict of index name -> state (e.g. "ONLINE", "POPULATING", "MISSING").
+    """
+    for name, statement in SCHEMA_STATEMENTS:
+        try:
+            neo4j.write(statement, label=f"schema_{name}")
+        except Exception as e:
+            # An existing duplicate value prevents a uniqueness constraint; keep going
+            print(f"Error creating Neo4j schema item '{name}': {e}")
+
+    if wait_seconds:
+        try:
+            neo4j.write("CALL db.awaitIndexes($timeout)", timeout=wait_seconds, label="schema_await_indexes")
+        except Exception as e:
+            print(f"Neo4j indexes not online after {wait_seconds}s: {e}")
+
+    states = get_schema_status(neo4j)
+    online = [name for name, state in states.items() if state == "ONLINE"]
+    print(f"\nNeo4j schema: {len(online)}/{len(states)} indexes online.")
+    for name, state in states.items():
+        if state != "ONLINE":
+            print(f"  {name}: {state}")
+    return states
+
+
+def get_schema_status(neo4j):
+    """Returns the state of each expected index (constraint-backed indexes share the constraint's name)."""
+    names = [name for name, _ in SCHEMA_STATEMENTS]
+    rows = neo4j.read("""
+        SHOW INDEXES YIELD name, state
+        WHERE name IN $names
+        RETURN name, state
+    """, names=names, label="schema_status")
+    found = {row["name"]: row["state"] for row in rows}
+    return {name: found.get(name, "MISSING") for name in names}
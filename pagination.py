@@ -0,0 +1,45 @@
+"""
+Keyset (cursor) pagination for the JSON job APIs.
+
+A cursor is the sort key of the last item on a page, e.g. {"id": 123} for lists
+ordered by Job Id or {"score": 4.2, "id": 123} for ranked search results, encoded
+as URL-safe base64 JSON. The next page is read strictly after that key with an
+indexed range condition, so paging never re-reads earlier results and pages stay
+stable when jobs are added in front of the cursor.
+
+Queries fetch one item more than the page size to know whether there is a next page.
+"""
+import base64
+import json
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+def encode_cursor(key):
+    payload = json.dumps(key, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(payload).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor):
+    """Sort key of a cursor, or None for the first page. Raises ValueError for a malformed cursor."""
+    if not cursor:
+        return None
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError("Invalid cursor")
+    if not isinstance(key, dict):
+        raise ValueError("Invalid cursor")
+    return key
+
+
+def page_size(value, default=DEFAULT_PAGE_SIZE):
+    return max(1, min(value or default, MAX_PAGE_SIZE))
+
+
+def paginate(items, limit, key):
+    """Split `limit + 1` fetched items into the page and the cursor of the next page (None on the last page)."""
+    page = items[:limit]
+    next_cursor = encode_cursor(key(page[-1])) if len(items) > limit else None
+    return page, next_cursor
@@ -1,21 +1,20 @@
+import argparse
 import pandas as pd
-from py2neo import Graph, Node, Relationship, NodeMatcher
 import re
+from job_fields import clean_and_split_skills, standardize_role
+from neo4j_client import Neo4jClient
+from neo4j_schema import setup_neo4j_schema
+from skill_matching import find_containment_pairs
+from result_cache import notify_data_changed
 
-# Step 1: Connect to Neo4j
-graph = Graph("bolt://localhost:7687", auth=("neo4j", "TestTest"))
+# Path of the jobs dataset
+DATASET_PATH = r"C:\Users\shahr\Documents\GitHub\MDB-FinalProject\dataset\jobs_10k.csv"
 
-# Step 2: Load the Dataset
-dataset_path = r"C:\Users\shahr\Documents\GitHub\MDB-FinalProject\dataset\jobs_10k.csv"
-df = pd.read_csv(dataset_path)
+# Number of IS_SIMILAR_TO relationships written per UNWIND query
+SIMILARITY_BATCH_SIZE = 10000
 
-# Step 3: Preprocess Skills
-def clean_and_split_skills(skills_text):
-    """Clean the skills text and split into individual skills."""
-    if not isinstance(skills_text, str) or not skills_text.strip():
-        return []
-    skills_text = re.sub(r"\(.*?\)", "", skills_text)  # Remove text in parentheses
-    return [skill.strip() for skill in re.split(r",| and ", skills_text) if skill.strip()]
+# Number of CSV rows read and written per batch in streaming mode
+CHUNK_SIZE = 1000
 
 # Step 4: Extract Key Phrases from Responsibilities
 def extract_keywords_from_responsibilities(text):
@@ -25,95 +24,219 @@ def extract_keywords_from_responsibilities(text):
     phrases = re.split(r",|\.| and ", text)  # Split on commas, periods, or 'and'
     return [phrase.strip() for phrase in phrases if phrase.strip()]
 
-# Step 5: Standardize Roles
-def standardize_role(role_text):
-    """Standardize job roles by removing unnecessary words."""
-    if not isinstance(role_text, str):
-        return role_text
-    return re.sub(r"[^a-zA-Z0-9\s]", "", role_text).strip()
-
-print("Preprocessing data...")
-df['skills_cleaned'] = df['skills'].apply(clean_and_split_skills)
-df['Responsibilities_cleaned'] = df['Responsibilities'].apply(extract_keywords_from_responsibilities)
-df['Role'] = df['Role'].apply(standardize_role)
+def preprocess(df):
+    df['skills_cleaned'] = df['skills'].apply(clean_and_split_skills)
+    df['Responsibilities_cleaned'] = df['Responsibilities'].apply(extract_keywords_from_responsibilities)
+    df['Role'] = df['Role'].apply(standardize_role)
+    return df
 
 # Step 6: Create Nodes and Relationships
-print("Creating nodes and relationships...")
-matcher = NodeMatcher(graph)
-
-# Create Skill Nodes
-skills_set = set()
-for skills in df['skills_cleaned']:
-    skills_set.update(skills)
-
-for i, skill in enumerate(skills_set, start=1):
-    skill_node = Node("Skill", name=skill)
-    graph.merge(skill_node, "Skill", "name")
-    if i % 100 == 0 or i == len(skills_set):
-        print(f"Processed {i}/{len(skills_set)} skills...")
-
-# Create Job Nodes and Relationships
-for i, row in df.iterrows():
-    # Create Job Node
-    job_node = Node(
-        "Job",
-        job_id=row['Job Id'],
-        title=row['Job Title'],
-        role=row['Role'],
-        company=row['Company'],
-        location=row['location']
-    )
-    graph.merge(job_node, "Job", "job_id")
-
-    # Create REQUIRES_SKILL relationships
-    for skill in row['skills_cleaned']:
-        skill_node = matcher.match("Skill", name=skill).first()
-        if skill_node:
-            graph.merge(Relationship(job_node, "REQUIRES_SKILL", skill_node))
-
-    # Create HAS_RESPONSIBILITY relationships
-    for resp in row['Responsibilities_cleaned']:
-        resp_node = Node("Responsibility", description=resp)
-        graph.merge(resp_node, "Responsibility", "description")
-        graph.merge(Relationship(job_node, "HAS_RESPONSIBILITY", resp_node))
-
-    # Create Company Nodes and POSTED_BY relationships
-    company_node = Node("Company", name=row['Company'])
-    graph.merge(company_node, "Company", "name")
-    graph.merge(Relationship(job_node, "POSTED_BY", company_node))
-
-    if (i + 1) % 100 == 0 or (i + 1) == len(df):
-        print(f"Processed {i+1}/{len(df)} jobs...")
+def load_in_memory(graph, dataset_path):
+    """Original loader: read the whole CSV, then look up and merge nodes one at a time."""
+    # Step 2: Load the Dataset
+    df = pd.read_csv(dataset_path)
+
+    print("Preprocessing data...")
+    preprocess(df)
+
+    print("Creating nodes and relationships...")
+
+    # Create Skill Nodes
+    skills_set = set()
+    for skills in df['skills_cleaned']:
+        skills_set.update(skills)
+
+    for i, skill in enumerate(skills_set, start=1):
+        graph.write("MERGE (:Skill {name: $name})", name=skill, label="merge_skill")
+        if i % 100 == 0 or i == len(skills_set):
+            print(f"Processed {i}/{len(skills_set)} skills...")
+
+    # Create Job Nodes and Relationships
+    for i, row in df.iterrows():
+        # Create Job Node
+        job_id = native(row['Job Id'])
+        graph.write("""
+            MERGE (j:Job {job_id: $job_id})
+            SET j.title = $title, j.role = $role, j.company = $company, j.location = $location
+        """, job_id=job_id, title=native(row['Job Title']), role=native(row['Role']),
+            company=native(row['Company']), location=native(row['location']), label="merge_job")
+
+        # Create REQUIRES_SKILL relationships
+        graph.write("""
+            MATCH (j:Job {job_id: $job_id})
+            UNWIND $skills AS skill
+            MATCH (s:Skill {name: skill})
+            MERGE (j)-[:REQUIRES_SKILL]->(s)
+        """, job_id=job_id, skills=row['skills_cleaned'], label="link_job_skills")
+
+        # Create HAS_RESPONSIBILITY relationships
+        graph.write("""
+            MATCH (j:Job {job_id: $job_id})
+            UNWIND $responsibilities AS description
+            MERGE (r:Responsibility {description: description})
+            MERGE (j)-[:HAS_RESPONSIBILITY]->(r)
+        """, job_id=job_id, responsibilities=row['Responsibilities_cleaned'], label="link_job_responsibilities")
+
+        # Create Company Nodes and POSTED_BY relationships
+        if native(row['Company']) is not None:
+            graph.write("""
+                MATCH (j:Job {job_id: $job_id})
+                MERGE (c:Company {name: $company})
+                MERGE (j)-[:POSTED_BY]->(c)
+            """, job_id=job_id, company=native(row['Company']), label="link_job_company")
+
+        if (i + 1) % 100 == 0 or (i + 1) == len(df):
+            print(f"Processed {i+1}/{len(df)} jobs...")
+
+    return skills_set
+
+def load_streaming(graph, dataset_path, chunk_size=CHUNK_SIZE):
+    """
+    Streaming loader: read the CSV in chunks and write each chunk with a few UNWIND
+    queries. Skills and companies created so far are kept in name -> elementId maps,
+    so only new names are merged and edges are linked without per-edge lookups.
+    Memory use is bounded by the chunk size plus the number of distinct skills/companies.
+    """
+    skill_ids = {}
+    company_ids = {}
+    processed = 0
+
+    print("Creating nodes and relationships in chunks...")
+    for df in pd.read_csv(dataset_path, chunksize=chunk_size):
+        preprocess(df)
+
+        # Create Skill and Company nodes not seen in earlier chunks
+        new_skills = {skill for skills in df['skills_cleaned'] for skill in skills} - skill_ids.keys()
+        skill_ids.update(merge_named_nodes(graph, "Skill", new_skills))
+        new_companies = {native(name) for name in df['Company'] if not pd.isna(name)} - company_ids.keys()
+        company_ids.update(merge_named_nodes(graph, "Company", new_companies))
+
+        jobs = []
+        skill_edges = []
+        company_edges = []
+        responsibility_edges = []
+        for row in df.to_dict("records"):
+            job_id = native(row['Job Id'])
+            company = native(row['Company'])
+            jobs.append({
+                "job_id": job_id,
+                "title": native(row['Job Title']),
+                "role": native(row['Role']),
+                "company": company,
+                "location": native(row['location']),
+            })
+            skill_edges.extend({"job_id": job_id, "node_id": skill_ids[skill]} for skill in row['skills_cleaned'])
+            responsibility_edges.extend({"job_id": job_id, "description": resp}
+                                        for resp in row['Responsibilities_cleaned'])
+            if company in company_ids:
+                company_edges.append({"job_id": job_id, "node_id": company_ids[company]})
+
+        graph.write("""
+            UNWIND $jobs AS row
+            MERGE (j:Job {job_id: row.job_id})
+            SET j += row
+        """, jobs=jobs, label="merge_jobs_batch")
+        graph.write("""
+            UNWIND $edges AS edge
+            MATCH (j:Job {job_id: edge.job_id})
+            MATCH (s:Skill) WHERE elementId(s) = edge.node_id
+            MERGE (j)-[:REQUIRES_SKILL]->(s)
+        """, edges=skill_edges, label="link_job_skills_batch")
+        graph.write("""
+            UNWIND $edges AS edge
+            MATCH (j:Job {job_id: edge.job_id})
+            MERGE (r:Responsibility {description: edge.description})
+            MERGE (j)-[:HAS_RESPONSIBILITY]->(r)
+        """, edges=responsibility_edges, label="link_job_responsibilities_batch")
+        graph.write("""
+            UNWIND $edges AS edge
+            MATCH (j:Job {job_id: edge.job_id})
+            MATCH (c:Company) WHERE elementId(c) = edge.node_id
+            MERGE (j)-[:POSTED_BY]->(c)
+        """, edges=company_edges, label="link_job_companies_batch")
+
+        processed += len(df)
+        print(f"Processed {processed} jobs ({len(skill_ids)} skills, {len(company_ids)} companies)...")
+
+    return set(skill_ids)
+
+def merge_named_nodes(graph, label, names):
+    """MERGE nodes by name in a single UNWIND query and return a name -> elementId map."""
+    if not names:
+        return {}
+    result = graph.write(f"""
+        UNWIND $names AS name
+        MERGE (n:{label} {{name: name}})
+        RETURN name, elementId(n) AS node_id
+    """, names=list(names), label=f"merge_{label.lower()}_nodes")
+    return {row["name"]: row["node_id"] for row in result}
+
+def native(value):
+    """Convert pandas/numpy scalars to plain Python values (NaN becomes None)."""
+    if pd.isna(value):
+        return None
+    return value.item() if hasattr(value, "item") else value
 
 # Step 7: Create IS_SIMILAR_TO Relationships for Skills
-print("Creating IS_SIMILAR_TO relationships for similar skills...")
-skills_list = list(skills_set)
-for i, skill1 in enumerate(skills_list):
-    for skill2 in skills_list:
-        if skill1 != skill2 and skill1.lower() in skill2.lower():  # Text-based similarity
-            node1 = matcher.match("Skill", name=skill1).first()
-            node2 = matcher.match("Skill", name=skill2).first()
-            if node1 and node2:
-                existing_rel = graph.relationships.match((node1, node2), "IS_SIMILAR_TO").first()
-                if not existing_rel:
-                    graph.create(Relationship(node1, "IS_SIMILAR_TO", node2))
-    if (i + 1) % 100 == 0 or i == len(skills_list):
-        print(f"Processed {i}/{len(skills_list)} skills for similarity...")
-
+def link_similar_skills(graph, skills_set):
+    """
+    Containment pairs are found in memory with an Aho-Corasick automaton over all
+    skill names, then written with batched UNWIND queries instead of per-pair lookups.
+    """
+    print("Creating IS_SIMILAR_TO relationships for similar skills...")
+    skills_list = list(skills_set)
+    similar_pairs = find_containment_pairs(skills_list)
+    print(f"Found {len(similar_pairs)} similar skill pairs.")
+    for start in range(0, len(similar_pairs), SIMILARITY_BATCH_SIZE):
+        batch = similar_pairs[start:start + SIMILARITY_BATCH_SIZE]
+        graph.write("""
+            UNWIND $pairs AS pair
+            MATCH (s1:Skill {name: pair[0]})
+            MATCH (s2:Skill {name: pair[1]})
+            MERGE (s1)-[:IS_SIMILAR_TO]->(s2)
+        """, pairs=[list(pair) for pair in batch], label="link_similar_skills")
+        print(f"Processed {min(start + SIMILARITY_BATCH_SIZE, len(similar_pairs))}/{len(similar_pairs)} skill pairs for similarity...")
 
 # Step 9: Query - Top 10 Companies with Most Job Postings
-print("Retrieving top companies by job postings...")
-top_companies_query = """
-    MATCH (c:Company)<-[:POSTED_BY]-(j:Job)
-    RETURN c.name AS company, COUNT(j) AS job_count
-    ORDER BY job_count DESC
-    LIMIT 10
-"""
-top_companies = graph.run(top_companies_query).data()
-
-print("Top 10 Companies with Most Job Postings:")
-for company in top_companies:
-    print(f"{company['company']}: {company['job_count']} jobs")
-
-print("All relationships created successfully.")
-print("Data import and processing complete!")
+def print_top_companies(graph):
+    print("Retrieving top companies by job postings...")
+    top_companies_query = """
+        MATCH (c:Company)<-[:POSTED_BY]-(j:Job)
+        RETURN c.name AS company, COUNT(j) AS job_count
+        ORDER BY job_count DESC
+        LIMIT 10
+    """
+    top_companies = graph.read(top_companies_query, label="top_companies")
+
+    print("Top 10 Companies with Most Job Postings:")
+    for company in top_companies:
+        print(f"{company['company']}: {company['job_count']} jobs")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Populate Neo4j with jobs, skills, responsibilities and companies.")
+    parser.add_argument("dataset_path", nargs="?", default=DATASET_PATH, help="Path to the jobs CSV file")
+    parser.add_argument("--stream", action="store_true",
+                        help="Read the CSV in chunks and write bulk batches instead of row by row")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="Rows per chunk in streaming mode")
+    args = parser.parse_args()
+
+    # Step 1: Connect to Neo4j
+    graph = Neo4jClient("bolt://localhost:7687", "neo4j", "TestTest")
+
+    # Create constraints and indexes before any MERGE
+    setup_neo4j_schema(graph)
+
+    if args.stream:
+        skills_set = load_streaming(graph, args.dataset_path, args.chunk_size)
+    else:
+        skills_set = load_in_memory(graph, args.dataset_path)
+
+    link_similar_skills(graph, skills_set)
+    print_top_companies(graph)
+    notify_data_changed("populate_neo4j")
+
+    graph.close()
+
+    print("All relationships created successfully.")
+    print("Data import and processing complete!")
@@ -0,0 +1,134 @@
+"""
+Per-user profile cache in front of `users_collection.find_one({"user.user_id": ...})`.
+
+By default profiles live in a bounded in-process LRU with a TTL. Setting
+PROFILE_CACHE_REDIS_URL in config.py (and installing `redis`) stores them in a
+local Redis instead, so every worker process shares one copy and sees the others'
+invalidations. Without Redis, a write in one worker leaves other workers' copies
+stale for at most PROFILE_CACHE_TTL seconds.
+
+The app invalidates a user's entry after every write to their document
+(signup, profile, save_job, remove_job). A profile loaded while an invalidation
+was in flight is returned but not stored, so a slow read cannot re-cache the
+document a concurrent write just replaced.
+"""
+from collections import OrderedDict
+import copy
+import threading
+import time
+from bson import json_util
+import config
+from metrics import registry
+
+# Maximum number of profiles kept in process memory
+PROFILE_CACHE_SIZE = getattr(config, "PROFILE_CACHE_SIZE", 1024)
+
+# Seconds a cached profile stays valid
+PROFILE_CACHE_TTL = getattr(config, "PROFILE_CACHE_TTL", 60)
+
+# e.g. "redis://localhost:6379/0"; None keeps profiles in process memory
+PROFILE_CACHE_REDIS_URL = getattr(config, "PROFILE_CACHE_REDIS_URL", None)
+
+
+class LocalBackend:
+    """Bounded LRU of profile documents with a TTL."""
+    def __init__(self, maxsize=PROFILE_CACHE_SIZE, ttl=PROFILE_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, user_id):
+        with self.lock:
+            entry = self.entries.get(user_id)
+            if entry is None or entry[0] <= time.monotonic():
+                self.entries.pop(user_id, None)
+                return None
+            self.entries.move_to_end(user_id)
+            return copy.deepcopy(entry[1])  # Callers may modify the document they get
+
+    def set(self, user_id, user):
+        with self.lock:
+            self.entries[user_id] = (time.monotonic() + self.ttl, copy.deepcopy(user))
+            self.entries.move_to_end(user_id)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def delete(self, user_id):
+        with self.lock:
+            self.entries.pop(user_id, None)
+
+    def size(self):
+        return len(self.entries)
+
+
+class RedisBackend:
+    """Profiles as Extended JSON strings in Redis, expiring after the TTL."""
+    def __init__(self, url, ttl=PROFILE_CACHE_TTL, prefix="profile:"):
+        import redis  # Optional dependency, only needed when PROFILE_CACHE_REDIS_URL is set
+
+        self.client = redis.Redis.from_url(url)
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def get(self, user_id):
+        value = self.client.get(f"{self.prefix}{user_id}")
+        return json_util.loads(value) if value is not None else None
+
+    def set(self, user_id, user):
+        self.client.setex(f"{self.prefix}{user_id}", self.ttl, json_util.dumps(user))
+
+    def delete(self, user_id):
+        self.client.delete(f"{self.prefix}{user_id}")
+
+    def size(self):
+        return None
+
+
+class ProfileCache:
+    def __init__(self, backend, metrics=registry):
+        self.backend = backend
+        self.metrics = metrics
+        self.invalidations = 0
+        self.lock = threading.Lock()
+
+    def get(self, user_id, load):
+        """Cached profile of user_id, calling load() (a find_one) on a miss. Missing users are not cached."""
+        try:
+            user = self.backend.get(user_id)
+        except Exception as e:
+            print(f"Error reading profile cache: {e}")
+            user = None
+        if user is not None:
+            self.metrics.incr("profile_cache.hits")
+            return user
+
+        self.metrics.incr("profile_cache.misses")
+        invalidations = self.invalidations
+        user = load()
+        if user is not None:
+            with self.lock:
+                if invalidations == self.invalidations:
+                    try:
+                        self.backend.set(user_id, user)
+                    except Exception as e:
+                        print(f"Error writing profile cache: {e}")
+        return user
+
+    def invalidate(self, user_id):
+        with self.lock:
+            self.invalidations += 1
+        self.metrics.incr("profile_cache.invalidations")
+        try:
+            self.backend.delete(user_id)
+        except Exception as e:
+            print(f"Error invalidating profile cache for user {user_id}: {e}")
+
+    def stats(self):
+        return {"backend": type(self.backend).__name__, "entries": self.backend.size()}
+
+
+def create_profile_cache():
+    if PROFILE_CACHE_REDIS_URL:
+        return ProfileCache(RedisBackend(PROFILE_CACHE_REDIS_URL))
+    return ProfileCache(LocalBackend())
@@ -0,0 +1,143 @@
+"""
+In-process result cache for the analytics endpoints.
+
+Entries expire after a TTL, the cache holds at most `maxsize` entries (least
+recently used are evicted first), and entries can be invalidated explicitly.
+Importers run in other processes, so they bump a data-version stamp stored in
+MongoDB (`cache_meta` collection); the cache polls that stamp at most every
+`version_check_seconds` and clears itself when it changes.
+"""
+from collections import OrderedDict
+from datetime import datetime, timezone
+import hashlib
+import json
+import threading
+import time
+
+# Seconds an analytics result stays cached
+ANALYTICS_TTL_SECONDS = 600
+
+# Maximum number of cached analytics results
+ANALYTICS_MAX_ENTRIES = 64
+
+# Seconds between checks of the shared data-version stamp
+VERSION_CHECK_SECONDS = 5
+
+DATA_VERSION_ID = "data_version"
+
+
+class CacheEntry:
+    def __init__(self, value, ttl, cost=0.0):
+        self.value = value
+        # Seconds it took to compute the value (reported as saved time on hits)
+        self.cost = cost
+        self.expires_at = time.monotonic() + ttl
+        self.last_modified = datetime.now(timezone.utc).replace(microsecond=0)
+        payload = json.dumps(value, sort_keys=True, default=str).encode("utf-8")
+        self.etag = hashlib.sha1(payload).hexdigest()
+
+
+class TTLCache:
+    def __init__(self, maxsize=ANALYTICS_MAX_ENTRIES, ttl=ANALYTICS_TTL_SECONDS,
+                 version_source=None, version_check_seconds=VERSION_CHECK_SECONDS):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.version_source = version_source
+        self.version_check_seconds = version_check_seconds
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.version = None
+        self.version_checked_at = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        self.check_version()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry.expires_at <= time.monotonic():
+                self.entries.pop(key, None)
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def set(self, key, value, cost=0.0):
+        entry = CacheEntry(value, self.ttl, cost)
+        with self.lock:
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+        return entry
+
+    def get_or_compute(self, key, compute):
+        entry = self.get(key)
+        if entry is None:
+            entry = self.set(key, compute())
+        return entry
+
+    def invalidate(self, *keys):
+        """Drop the given keys, or every entry when no keys are given."""
+        with self.lock:
+            if keys:
+                for key in keys:
+                    self.entries.pop(key, None)
+            else:
+                self.entries.clear()
+            self.invalidations += 1
+
+    def check_version(self):
+        """Clear the cache if another process bumped the shared data version."""
+        if self.version_source is None:
+            return
+        now = time.monotonic()
+        if now - self.version_checked_at < self.version_check_seconds:
+            return
+        self.version_checked_at = now
+        try:
+            version = self.version_source()
+        except Exception as e:
+            print(f"Error reading cache data version: {e}")
+            return
+        if self.version is not None and version != self.version:
+            self.invalidate()
+        self.version = version
+
+    def stats(self):
+        with self.lock:
+            return {
+                "entries": len(self.entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+            }
+
+
+def get_data_version(db):
+    """Current shared data-version stamp (0 if no import has recorded one yet)."""
+    doc = db['cache_meta'].find_one({"_id": DATA_VERSION_ID})
+    return doc["version"] if doc else 0
+
+
+def bump_data_version(db, reason=""):
+    """Invalidation hook: tells every app process to drop cached analytics results."""
+    db['cache_meta'].update_one(
+        {"_id": DATA_VERSION_ID},
+        {"$inc": {"version": 1}, "$set": {"updated_at": datetime.now(), "reason": reason}},
+        upsert=True
+    )
+
+
+def notify_data_changed(reason=""):
+    """bump_data_version() for scripts that do not otherwise hold a MongoDB connection."""
+    from pymongo import MongoClient
+    from config import ATLAS_URI, DB_NAME
+
+    client = MongoClient(ATLAS_URI)
+    try:
+        bump_data_version(client[DB_NAME], reason)
+    finally:
+        client.close()
@@ -1,5 +1,6 @@
 from pymongo import MongoClient
-from neo4j import GraphDatabase
+from neo4j_client import Neo4jClient
+from neo4j_schema import setup_neo4j_schema
 
 # Connect to MongoDB
 mongo_client = MongoClient("mongodb://localhost:27017/")
@@ -7,28 +8,30 @@ db = mongo_client['jobfusion']  # MongoDB database
 users_collection = db['users']  # MongoDB collection for users
 
 # Connect to Neo4j
-neo4j_driver = GraphDatabase.driver("bolt://localhost:7687", auth=("neo4j", "neo4jneo4j"))
+neo4j = Neo4jClient("bolt://localhost:7687", "neo4j", "neo4jneo4j")
 
 def create_user_and_saved_jobs(user_data):
-    with neo4j_driver.session() as session:
-        for user in user_data:
-            user_id = user["user"]["user_id"]
-            skills = user["user_personal"]["skills"]
-            saved_jobs = user["user_job_preferences"]["saved_jobs"]
-
-            # Create User node with user_id and skills
-            session.run("""
-                MERGE (u:User {user_id: $user_id})
-                SET u.skills = $skills
-            """, user_id=user_id, skills=skills)
-
-            # Create :SAVED relationships to Jobs
-            for job_id in saved_jobs:
-                session.run("""
-                    MATCH (u:User {user_id: $user_id})
-                    MERGE (j:Job {job_id: $job_id})
-                    MERGE (u)-[:SAVED]->(j)
-                """, user_id=user_id, job_id=job_id)
+    for user in user_data:
+        user_id = user["user"]["user_id"]
+        skills = user["user_personal"]["skills"]
+        saved_jobs = user["user_job_preferences"]["saved_jobs"]
+
+        # Create User node with user_id and skills
+        neo4j.write("""
+            MERGE (u:User {user_id: $user_id})
+            SET u.skills = $skills
+        """, user_id=user_id, skills=skills, label="merge_user")
+
+        # Create :SAVED relationships to Jobs
+        for job_id in saved_jobs:
+            neo4j.write("""
+                MATCH (u:User {user_id: $user_id})
+                MERGE (j:Job {job_id: $job_id})
+                MERGE (u)-[:SAVED]->(j)
+            """, user_id=user_id, job_id=job_id, label="merge_saved_job")
+
+# Create constraints and indexes before any MERGE
+setup_neo4j_schema(neo4j)
 
 # Fetch user data from MongoDB
 user_data = users_collection.find({})
@@ -37,5 +40,5 @@ user_data = users_collection.find({})
 create_user_and_saved_jobs(user_data)
 
 # Close the connection
-neo4j_driver.close()
+neo4j.close()
 
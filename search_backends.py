@@ -0,0 +1,264 @@
+"""
+Pluggable full-text job search used by the main page.
+
+    mongo   MongoDB $text on job_text_index, ranked by textScore
+    bm25    the in-process BM25 index of bm25_index.py, with the matching jobs
+            then fetched from MongoDB by Job Id
+
+SEARCH_BACKEND in config.py picks one (default "mongo"). Both return jobs with a
+`score`, highest first, with ties broken by Job Id, and page either by `offset`
+or by keyset: `after` is the (score, Job Id) of the previous page's last job.
+
+The BM25 index is saved under BM25_INDEX_DIR and memory-mapped by a background
+thread the app starts on its first request; if there is none yet, that thread
+builds it from the jobs collection and saves it. Only one process builds at a
+time (a BUILDING lock file in the index directory); the others wait for the
+saved index. Until the index is ready, searches are answered by MongoDB $text.
+It is kept current incrementally: when the shared data version changes (the
+importers bump it), jobs inserted since the last indexed MongoDB _id are added.
+mongodb_JobImport.py also folds newly imported jobs into the saved index, so a
+restarted app maps an up-to-date index. `python search_backends.py --rebuild`
+rebuilds it from scratch.
+"""
+import os
+import threading
+import time
+from bson import ObjectId
+import config
+from bm25_index import BM25Index, FIELD_BOOSTS
+from result_cache import VERSION_CHECK_SECONDS
+
+# "mongo" ($text) or "bm25" (bm25_index.py)
+SEARCH_BACKEND = getattr(config, "SEARCH_BACKEND", "mongo")
+
+# Directory holding the saved BM25 index generations
+BM25_INDEX_DIR = getattr(config, "BM25_INDEX_DIR", "search_index")
+
+# Jobs read from MongoDB per batch while indexing
+INDEX_BATCH_SIZE = 1000
+
+# Seconds between checks for an index another process is building
+BUILD_POLL_SECONDS = 5
+
+# Age in seconds after which a BUILDING lock is taken to be left by a build that died
+BUILD_LOCK_SECONDS = 3600
+
+# Fields of a job in search results (and the other job lists of the main page)
+SEARCH_PROJECTION = {"_id": 0, "Job Id": 1, "Job Title": 1, "Company": 1, "location": 1, "Salary Range": 1}
+INDEX_PROJECTION = {"Job Id": 1, **{field: 1 for field in FIELD_BOOSTS}}
+
+
+class MongoTextSearch:
+    name = "mongo"
+
+    def __init__(self, jobs_collection):
+        self.jobs = jobs_collection
+
+    def search(self, query, limit=10, offset=0, after=None):
+        if after is None:
+            cursor = self.jobs.find({"$text": {"$search": query}},
+                                    {**SEARCH_PROJECTION, "score": {"$meta": "textScore"}})
+            cursor = cursor.sort([("score", {"$meta": "textScore"}), ("Job Id", 1)])
+            return list(cursor.skip(offset).limit(limit))
+
+        # Keyset page: results ranked after the (score, Job Id) of the previous page's last job
+        after_score, after_job_id = after
+        return list(self.jobs.aggregate([
+            {"$match": {"$text": {"$search": query}}},
+            {"$addFields": {"score": {"$meta": "textScore"}}},
+            {"$match": {"$or": [{"score": {"$lt": after_score}},
+                                {"score": after_score, "Job Id": {"$gt": after_job_id}}]}},
+            {"$sort": {"score": -1, "Job Id": 1}},
+            {"$skip": offset},
+            {"$limit": limit},
+            {"$project": {**SEARCH_PROJECTION, "score": 1}},
+        ]))
+
+    def warm(self):
+        pass
+
+    def stats(self):
+        return {"backend": self.name}
+
+
+class BM25Search:
+    def __init__(self, jobs_collection, index_dir=BM25_INDEX_DIR, version_source=None,
+                 version_check_seconds=VERSION_CHECK_SECONDS, fallback=None):
+        self.jobs = jobs_collection
+        self.index_dir = index_dir
+        self.version_source = version_source
+        self.version_check_seconds = version_check_seconds
+        # Answers searches until the index is ready; without one, the first search builds the index
+        self.fallback = fallback
+        self.lock = threading.Lock()
+        self.build_lock = threading.Lock()
+        self.index = None
+        self.version = None
+        self.version_checked_at = 0.0
+
+    @property
+    def name(self):
+        """Backend answering searches right now (results of the two are cached apart)."""
+        return "bm25" if self.index is not None or self.fallback is None else self.fallback.name
+
+    def warm(self):
+        self.build_index()
+
+    def build_index(self):
+        """
+        Open the saved index, building and saving it first if there is none, and catch up with
+        the jobs imported since. While another process holds the build lock, wait for its index.
+        """
+        with self.build_lock:
+            while self.index is None:
+                index = BM25Index.load(self.index_dir)
+                if index is None and acquire_build_lock(self.index_dir):
+                    try:
+                        index = BM25Index.load(self.index_dir)  # Another process may just have saved one
+                        if index is None:
+                            built = BM25Index()
+                            index_new_jobs(built, self.jobs)
+                            built.save(self.index_dir)
+                            print(f"Built BM25 index over {len(built)} jobs in {self.index_dir}.")
+                            index = BM25Index.load(self.index_dir)  # Compact, memory-mapped arrays
+                    finally:
+                        release_build_lock(self.index_dir)
+                if index is None:
+                    time.sleep(BUILD_POLL_SECONDS)
+                    continue
+                version = self.read_version()
+                index_new_jobs(index, self.jobs)
+                with self.lock:
+                    self.version = version
+                    self.version_checked_at = time.monotonic()
+                    self.index = index
+            return self.index
+
+    def ensure_index(self):
+        """The index, caught up with jobs imported since it was opened; None while it is being built."""
+        if self.index is None:
+            if self.fallback is not None:
+                return None
+            self.build_index()
+        with self.lock:
+            if time.monotonic() - self.version_checked_at >= self.version_check_seconds:
+                self.version_checked_at = time.monotonic()
+                version = self.read_version()
+                if version != self.version:
+                    self.version = version
+                    index_new_jobs(self.index, self.jobs)
+            return self.index
+
+    def read_version(self):
+        if self.version_source is None:
+            return None
+        try:
+            return self.version_source()
+        except Exception as e:
+            print(f"Error reading search index data version: {e}")
+            return self.version
+
+    def search(self, query, limit=10, offset=0, after=None):
+        index = self.ensure_index()
+        if index is None:
+            return self.fallback.search(query, limit=limit, offset=offset, after=after)
+        hits = index.search(query, limit, offset, after)
+        jobs = {job["Job Id"]: job for job in
+                self.jobs.find({"Job Id": {"$in": [job_id for job_id, _ in hits]}}, SEARCH_PROJECTION)}
+        return [dict(jobs[job_id], score=score) for job_id, score in hits if job_id in jobs]
+
+    def stats(self):
+        index = self.index
+        return {"backend": self.name, **(index.stats() if index is not None else {"loaded": False})}
+
+
+def acquire_build_lock(index_dir):
+    """Create index_dir/BUILDING exclusively; False while another live process is building."""
+    os.makedirs(index_dir, exist_ok=True)
+    path = os.path.join(index_dir, "BUILDING")
+    try:
+        if time.time() - os.path.getmtime(path) > BUILD_LOCK_SECONDS:
+            os.remove(path)
+    except FileNotFoundError:
+        pass
+    try:
+        os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        return True
+    except FileExistsError:
+        return False
+
+
+def release_build_lock(index_dir):
+    try:
+        os.remove(os.path.join(index_dir, "BUILDING"))
+    except FileNotFoundError:
+        pass
+
+
+def index_new_jobs(index, jobs_collection, batch_size=INDEX_BATCH_SIZE, projection=INDEX_PROJECTION):
+    """
+    Add the jobs inserted after the last MongoDB _id the index has seen (index.meta["last_object_id"])
+    with index.add_jobs(). Returns the number added.
+    """
+    query = {"Job Id": {"$exists": True}}
+    last_id = index.meta.get("last_object_id")
+    if last_id:
+        query["_id"] = {"$gt": ObjectId(last_id)}
+
+    added = 0
+    batch = []
+    for job in jobs_collection.find(query, projection).sort("_id", 1):
+        batch.append(job)
+        if len(batch) >= batch_size:
+            added += index_batch(index, batch)
+            batch = []
+    if batch:
+        added += index_batch(index, batch)
+    return added
+
+
+def index_batch(index, batch):
+    added = index.add_jobs(batch)
+    index.meta["last_object_id"] = str(batch[-1]["_id"])
+    return added
+
+
+def update_saved_index(jobs_collection, index_dir=BM25_INDEX_DIR):
+    """Fold newly imported jobs into the saved index, if one exists (called by the importer)."""
+    index = BM25Index.load(index_dir)
+    if index is None:
+        return 0
+    added = index_new_jobs(index, jobs_collection)
+    if added:
+        index.save(index_dir)
+        print(f"Added {added} jobs to the BM25 index in {index_dir}.")
+    return added
+
+
+def create_search_backend(jobs_collection, version_source=None, name=SEARCH_BACKEND):
+    if name == "bm25":
+        return BM25Search(jobs_collection, version_source=version_source,
+                          fallback=MongoTextSearch(jobs_collection))
+    if name == "mongo":
+        return MongoTextSearch(jobs_collection)
+    raise ValueError(f"Unknown SEARCH_BACKEND '{name}' (expected 'mongo' or 'bm25')")
+
+
+if __name__ == "__main__":
+    import argparse
+    from pymongo import MongoClient
+    from config import ATLAS_URI, DB_NAME
+
+    parser = argparse.ArgumentParser(description="Build or update the saved BM25 job search index.")
+    parser.add_argument("--index-dir", default=BM25_INDEX_DIR)
+    parser.add_argument("--rebuild", action="store_true", help="Index every job from scratch")
+    args = parser.parse_args()
+
+    client = MongoClient(ATLAS_URI)
+    started = time.perf_counter()
+    index = None if args.rebuild else BM25Index.load(args.index_dir, mmap=False)
+    index = index if index is not None else BM25Index()
+    added = index_new_jobs(index, client[DB_NAME]['jobs'])
+    index.save(args.index_dir)
+    print(f"Indexed {added} new jobs ({len(index)} total) in {time.perf_counter() - started:.1f}s.")
+    client.close()
@@ -0,0 +1,112 @@
+"""
+Compare the search backends (search_backends.py) on latency and relevance.
+
+Queries are the most common Role values plus any given with --query. There are
+no human relevance judgments, so a result counts as relevant when its Role or
+Job Title contains every term of the query. Reported per backend: latency
+(p50/p95/mean over --repeat runs of each query), precision@10, MRR, and the
+overlap of the two backends' top 10. For BM25 the time spent in the index alone
+(without fetching the jobs from MongoDB) and the index open time are shown too.
+
+    python search_benchmark.py --queries 50 --repeat 5 --query "python developer"
+"""
+import argparse
+import time
+import numpy as np
+from pymongo import MongoClient
+from config import ATLAS_URI, DB_NAME
+from bm25_index import BM25Index, tokenize
+from search_backends import BM25_INDEX_DIR, BM25Search, MongoTextSearch
+
+TOP_K = 10
+
+
+def sample_queries(jobs_collection, count):
+    """The `count` most common Role values."""
+    return [row["_id"] for row in jobs_collection.aggregate([
+        {"$group": {"_id": "$Role", "jobs": {"$sum": 1}}},
+        {"$match": {"_id": {"$type": "string"}}},
+        {"$sort": {"jobs": -1}},
+        {"$limit": count},
+    ])]
+
+
+def is_relevant(query, job):
+    terms = set(tokenize(query))
+    return any(terms <= set(tokenize(job.get(field))) for field in ("Role", "Job Title"))
+
+
+def time_calls(call, queries, repeat):
+    """Latencies in milliseconds, and the results of the last run per query."""
+    latencies, results = [], {}
+    for _ in range(repeat):
+        for query in queries:
+            started = time.perf_counter()
+            results[query] = call(query)
+            latencies.append((time.perf_counter() - started) * 1000)
+    return latencies, results
+
+
+def relevance(jobs_collection, queries, results):
+    """Precision@TOP_K and mean reciprocal rank under the Role/Job Title proxy."""
+    precisions, reciprocal_ranks = [], []
+    for query in queries:
+        job_ids = [job["Job Id"] for job in results[query]]
+        roles = {job["Job Id"]: job for job in
+                 jobs_collection.find({"Job Id": {"$in": job_ids}}, {"Job Id": 1, "Role": 1, "Job Title": 1})}
+        relevant = [job_id in roles and is_relevant(query, roles[job_id]) for job_id in job_ids]
+        precisions.append(sum(relevant) / TOP_K)
+        reciprocal_ranks.append(next((1 / (rank + 1) for rank, hit in enumerate(relevant) if hit), 0.0))
+    return float(np.mean(precisions)), float(np.mean(reciprocal_ranks))
+
+
+def report(name, latencies, precision=None, mrr=None):
+    line = (f"{name:<16} p50 {np.percentile(latencies, 50):8.2f} ms   p95 {np.percentile(latencies, 95):8.2f} ms"
+            f"   mean {np.mean(latencies):8.2f} ms")
+    if precision is not None:
+        line += f"   P@{TOP_K} {precision:.3f}   MRR {mrr:.3f}"
+    print(line)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark $text against the BM25 search index.")
+    parser.add_argument("--queries", type=int, default=50, help="Number of Role values used as queries")
+    parser.add_argument("--query", action="append", default=[], help="Extra query (repeatable)")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs of each query per backend")
+    parser.add_argument("--index-dir", default=BM25_INDEX_DIR)
+    args = parser.parse_args()
+
+    client = MongoClient(ATLAS_URI)
+    jobs = client[DB_NAME]['jobs']
+    queries = args.query + sample_queries(jobs, args.queries)
+    print(f"{len(queries)} queries, {args.repeat} runs each, {jobs.estimated_document_count()} jobs\n")
+
+    mongo = MongoTextSearch(jobs)
+    bm25 = BM25Search(jobs, index_dir=args.index_dir)
+    started = time.perf_counter()
+    index = bm25.ensure_index()  # Builds and saves the index if there is none yet
+    print(f"BM25 index ready in {(time.perf_counter() - started) * 1000:.1f} ms: {index.stats()}")
+    started = time.perf_counter()
+    BM25Index.load(args.index_dir)
+    print(f"BM25 index memory-mapped in {(time.perf_counter() - started) * 1000:.1f} ms\n")
+
+    # Warm up connections and caches before timing
+    for query in queries[:5]:
+        mongo.search(query, limit=TOP_K)
+        bm25.search(query, limit=TOP_K)
+
+    mongo_latencies, mongo_results = time_calls(lambda q: mongo.search(q, limit=TOP_K), queries, args.repeat)
+    bm25_latencies, bm25_results = time_calls(lambda q: bm25.search(q, limit=TOP_K), queries, args.repeat)
+    index_latencies, _ = time_calls(lambda q: index.search(q, limit=TOP_K), queries, args.repeat)
+
+    report("mongo $text", mongo_latencies, *relevance(jobs, queries, mongo_results))
+    report("bm25", bm25_latencies, *relevance(jobs, queries, bm25_results))
+    report("bm25 index only", index_latencies)
+
+    overlaps = []
+    for query in queries:
+        mongo_ids = {job["Job Id"] for job in mongo_results[query]}
+        bm25_ids = {job["Job Id"] for job in bm25_results[query]}
+        overlaps.append(len(mongo_ids & bm25_ids) / TOP_K)
+    print(f"\nTop-{TOP_K} overlap between backends: {np.mean(overlaps):.3f}")
+    client.close()
@@ -0,0 +1,144 @@
+"""
+Result cache for full-text job searches.
+
+Queries are cached under a normalised key: lowercased, stopwords dropped, and
+terms sorted and deduplicated, so "Python  Remote" and "remote python" share an
+entry. Quoted phrases and negated terms ("-java") are kept as they are because
+they change what $text matches. The key also holds the backend name and the page
+(offset or keyset position).
+
+SearchResultCache is the analytics TTLCache (LRU eviction, TTL, cleared when the
+shared data version changes, i.e. after job imports) plus TinyLFU admission: a
+count-min sketch estimates how often each key was looked up recently, and when
+the cache is full a new result only replaces the least recently used one if its
+query is more popular. One-off searches therefore do not push out the common
+ones. Each entry remembers how long its search took, so hits report the latency
+they saved.
+"""
+import re
+import time
+import numpy as np
+from bm25_index import STOPWORDS
+from result_cache import TTLCache
+
+# Cached search results per process
+SEARCH_CACHE_SIZE = 1024
+
+# Seconds a cached search result stays valid
+SEARCH_CACHE_TTL = 300
+
+# Count-min sketch counters per row (a power of two) and number of rows
+SKETCH_WIDTH = 16384
+SKETCH_DEPTH = 4
+
+QUERY_TERM = re.compile(r'-?"[^"]*"|\S+')
+
+
+def normalize_query(query):
+    """Order- and case-insensitive form of a search query."""
+    terms = set()
+    for term in QUERY_TERM.findall((query or "").lower()):
+        if '"' in term:
+            term = re.sub(r"\s+", " ", term)
+        elif term.strip("-") in STOPWORDS or not term.strip("-"):
+            continue
+        terms.add(term)
+    return " ".join(sorted(terms))
+
+
+def search_cache_key(backend, query, limit, offset=0, after=None):
+    return (backend, normalize_query(query), limit, offset, after)
+
+
+class CountMinSketch:
+    """
+    Approximate per-key counts in fixed memory (SKETCH_DEPTH x SKETCH_WIDTH bytes).
+    Counts saturate at 255 and are halved after `reset_after` increments so old
+    popularity fades. Updates are not locked; a lost increment only makes an
+    estimate slightly low.
+    """
+    def __init__(self, width=SKETCH_WIDTH, depth=SKETCH_DEPTH, reset_after=None):
+        self.width = width
+        self.counters = np.zeros((depth, width), dtype=np.uint8)
+        self.rows = np.arange(depth)
+        self.reset_after = reset_after or 10 * width
+        self.increments = 0
+
+    def columns(self, key):
+        return np.array([hash((row, key)) & (self.width - 1) for row in range(len(self.counters))])
+
+    def add(self, key):
+        columns = self.columns(key)
+        values = self.counters[self.rows, columns]
+        self.counters[self.rows, columns] = np.minimum(values.astype(np.int16) + 1, 255)
+        self.increments += 1
+        if self.increments >= self.reset_after:
+            self.counters >>= 1
+            self.increments = 0
+
+    def estimate(self, key):
+        return int(self.counters[self.rows, self.columns(key)].min())
+
+
+class SearchResultCache(TTLCache):
+    def __init__(self, maxsize=SEARCH_CACHE_SIZE, ttl=SEARCH_CACHE_TTL, version_source=None, sketch=None):
+        super().__init__(maxsize=maxsize, ttl=ttl, version_source=version_source)
+        self.sketch = sketch or CountMinSketch()
+        self.rejected = 0
+        self.saved_seconds = 0.0
+
+    def get(self, key):
+        self.sketch.add(key)
+        entry = super().get(key)
+        if entry is not None:
+            self.saved_seconds += entry.cost
+        return entry
+
+    def set(self, key, value, cost=0.0):
+        """Store a result unless the cache is full and the LRU entry's query is more popular."""
+        with self.lock:
+            if key not in self.entries and len(self.entries) >= self.maxsize:
+                victim, victim_entry = next(iter(self.entries.items()))
+                if (victim_entry.expires_at > time.monotonic()
+                        and self.sketch.estimate(key) <= self.sketch.estimate(victim)):
+                    self.rejected += 1
+                    return None
+        return super().set(key, value, cost)
+
+    def stats(self):
+        stats = super().stats()
+        lookups = stats["hits"] + stats["misses"]
+        stats.update(
+            hit_rate=round(stats["hits"] / lookups, 3) if lookups else 0.0,
+            saved_ms=round(self.saved_seconds * 1000, 1),
+            rejected=self.rejected,
+        )
+        return stats
+
+
+class CachedSearch:
+    """A search backend (search_backends.py) with its results cached in a SearchResultCache."""
+    def __init__(self, backend, cache):
+        self.backend = backend
+        self.cache = cache
+
+    @property
+    def name(self):
+        return self.backend.name
+
+    def warm(self):
+        self.backend.warm()
+
+    def search(self, query, limit=10, offset=0, after=None):
+        # Read per call: a BM25 backend answers with its $text fallback until its index is built
+        key = search_cache_key(self.backend.name, query, limit, offset, after)
+        entry = self.cache.get(key)
+        if entry is None:
+            started = time.perf_counter()
+            results = self.backend.search(query, limit=limit, offset=offset, after=after)
+            self.cache.set(key, [dict(job) for job in results], cost=time.perf_counter() - started)
+            return results
+        return [dict(job) for job in entry.value]  # Callers may modify the jobs they get
+
+    def stats(self):
+        return {**self.backend.stats(), "cache": self.cache.stats()}
@@ -0,0 +1,77 @@
+"""
+Multi-pattern substring matching used to link similar skills (IS_SIMILAR_TO).
+"""
+from collections import defaultdict, deque
+
+
+class AhoCorasick:
+    """
+    Aho-Corasick automaton over a fixed list of patterns. Scanning a text reports
+    every pattern occurring in it in O(len(text) + matches), independent of the
+    number of patterns.
+    """
+    def __init__(self, patterns):
+        self.patterns = list(patterns)
+        self.goto = [{}]
+        self.fail = [0]
+        self.terminal = [None]   # pattern index ending at each state
+        self.dict_link = [0]     # nearest terminal state along the fail chain (0 = none)
+
+        for index, pattern in enumerate(self.patterns):
+            state = 0
+            for char in pattern:
+                next_state = self.goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self.goto)
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.terminal.append(None)
+                    self.dict_link.append(0)
+                    self.goto[state][char] = next_state
+                state = next_state
+            self.terminal[state] = index
+
+        # Breadth-first pass to compute failure and dictionary-suffix links
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, child in self.goto[state].items():
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(char, 0)
+                fail_state = self.fail[child]
+                self.dict_link[child] = fail_state if self.terminal[fail_state] is not None else self.dict_link[fail_state]
+                queue.append(child)
+
+    def iter_matches(self, text):
+        """Yield the index of every pattern occurrence in `text` (repeats included)."""
+        state = 0
+        for char in text:
+            while state and char not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(char, 0)
+            match_state = state if self.terminal[state] is not None else self.dict_link[state]
+            while match_state:
+                yield self.terminal[match_state]
+                match_state = self.dict_link[match_state]
+
+
+def find_containment_pairs(skills):
+    """
+    Return (skill1, skill2) pairs where skill1 != skill2 and skill1.lower() is a
+    substring of skill2.lower(), i.e. the same pairs as the original nested loop.
+    """
+    variants = defaultdict(list)
+    for skill in skills:
+        variants[skill.lower()].append(skill)
+    keys = list(variants)
+    automaton = AhoCorasick(keys)
+
+    pairs = []
+    for skill2 in skills:
+        for index in set(automaton.iter_matches(skill2.lower())):
+            for skill1 in variants[keys[index]]:
+                if skill1 != skill2:
+                    pairs.append((skill1, skill2))
+    return pairs
@@ -0,0 +1,256 @@
+"""
+Vectorised ranking of jobs for a user ("Relevant Jobs" on the main page).
+
+Every job's `skills` text is a row of a sparse CSR matrix of raw term counts
+(terms as bm25_index.tokenize splits them). A user's skills, plus their
+upskilling interests at UPSKILLING_WEIGHT, form the query vector, and the skill
+match of every job is the cosine of the TF-IDF weighted vectors:
+
+    match = weights[:, query_terms] @ (query * idf)[query_terms] / |query * idf|
+
+where `weights` holds the L2-normalised TF-IDF rows in column-major (CSC)
+form, so scoring reads only the columns of the user's terms: one sparse
+matrix-vector product over all jobs, touching just the jobs that share a term. Preference matches (location,
+work type, preferred role, industry from the Company Profile sector) add fixed
+boosts, computed on integer-coded columns. Jobs whose salary range does not
+overlap the user's preferred range are excluded, as the old $or query did. The
+best `limit` are picked with np.partition rather than a full sort.
+
+Jobs are added incrementally (the jobs inserted after the last indexed MongoDB
+_id, like the search indexes): new rows are appended to the matrix and the IDF
+weights and normalised rows are recomputed, a single pass over the non-zeros.
+"""
+from collections import Counter
+import re
+import threading
+import time
+import numpy as np
+import scipy.sparse as sp
+from bm25_index import tokenize
+from result_cache import VERSION_CHECK_SECONDS
+from search_backends import index_new_jobs
+
+# Weight of an upskilling interest relative to a current skill in the query vector
+UPSKILLING_WEIGHT = 0.5
+
+# Added to the skill match (a cosine in [0, 1]) for each matching preference
+PREFERENCE_BOOSTS = {"location": 0.3, "work_type": 0.2, "role": 0.3, "sector": 0.2}
+
+SCORING_PROJECTION = {"Job Id": 1, "skills": 1, "location": 1, "Work Type": 1, "Role": 1,
+                      "Company Profile": 1, "salary_min": 1, "salary_max": 1}
+
+SECTOR_PATTERN = re.compile(r'"Sector"\s*:\s*"([^"]*)"')
+
+
+def job_sector(job):
+    match = SECTOR_PATTERN.search(job.get("Company Profile") or "")
+    return match.group(1) if match else None
+
+
+def as_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+class SkillMatrix:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.term_columns = {}
+        self.counts = sp.csr_matrix((0, 0), dtype=np.float32)
+        self.job_ids = np.array([], dtype=np.int64)
+        self.alive = np.array([], dtype=bool)
+        self.salary_min = np.array([], dtype=np.float64)
+        self.salary_max = np.array([], dtype=np.float64)
+        # Preference columns as integer codes (-1 = missing), with one code table per column
+        self.codes = {name: {} for name in PREFERENCE_BOOSTS}
+        self.preferences = {name: np.array([], dtype=np.int32) for name in PREFERENCE_BOOSTS}
+        self.row_by_job_id = {}
+        self.idf = np.array([], dtype=np.float64)
+        # Normalised TF-IDF rows, column-major for scoring
+        self.weights = sp.csc_matrix((0, 0), dtype=np.float32)
+        # Parsed jobs waiting to be appended by the next refresh()
+        self.pending = []
+        # Stored with the matrix, e.g. the last MongoDB _id indexed
+        self.meta = {}
+
+    def __len__(self):
+        return len(self.row_by_job_id) + len(self.pending)
+
+    def code(self, name, value):
+        if value is None or value == "":
+            return -1
+        return self.codes[name].setdefault(value, len(self.codes[name]))
+
+    def add_jobs(self, jobs):
+        """Queue jobs to be appended on the next refresh(). Returns the number added."""
+        with self.lock:
+            for job in jobs:
+                terms = Counter(self.term_columns.setdefault(term, len(self.term_columns))
+                                for term in tokenize(job.get("skills")))
+                self.pending.append((
+                    int(job["Job Id"]), terms, as_float(job.get("salary_min")), as_float(job.get("salary_max")),
+                    {"location": self.code("location", job.get("location")),
+                     "work_type": self.code("work_type", job.get("Work Type")),
+                     "role": self.code("role", job.get("Role")),
+                     "sector": self.code("sector", job_sector(job))},
+                ))
+        return len(jobs)
+
+    def refresh(self):
+        """Append the queued jobs and recompute the IDF weights and normalised rows."""
+        with self.lock:
+            if not self.pending:
+                return
+            pending, self.pending = self.pending, []
+            indptr = np.cumsum([0] + [len(terms) for _, terms, _, _, _ in pending])
+            indices = np.fromiter((column for _, terms, _, _, _ in pending for column in terms),
+                                  dtype=np.int32, count=indptr[-1])
+            data = np.fromiter((count for _, terms, _, _, _ in pending for count in terms.values()),
+                               dtype=np.float32, count=indptr[-1])
+            width = len(self.term_columns)
+            new_rows = sp.csr_matrix((data, indices, indptr), shape=(len(pending), width))
+            # Widen the existing rows to the grown vocabulary without touching the matrix readers hold
+            old_rows = sp.csr_matrix((self.counts.data, self.counts.indices, self.counts.indptr),
+                                     shape=(self.counts.shape[0], width))
+            counts = sp.vstack([old_rows, new_rows], format="csr")
+
+            first_row = len(self.job_ids)
+            job_ids = np.concatenate([self.job_ids, [job_id for job_id, _, _, _, _ in pending]]).astype(np.int64)
+            alive = np.concatenate([self.alive, np.ones(len(pending), dtype=bool)])
+            for offset, (job_id, _, _, _, _) in enumerate(pending):
+                previous = self.row_by_job_id.get(job_id)
+                if previous is not None:
+                    alive[previous] = False  # Re-imported job: the newest row wins
+                self.row_by_job_id[job_id] = first_row + offset
+
+            # Document frequencies over live rows, smoothed IDF and L2-normalised TF-IDF rows
+            present = counts.copy()
+            present.data[:] = 1
+            document_frequency = present.T @ alive.astype(np.float64)
+            idf = np.log((1 + alive.sum()) / (1 + document_frequency)) + 1
+            norms = np.sqrt(counts.multiply(counts) @ (idf ** 2))
+            inverse_norms = np.divide(1.0, norms, out=np.zeros_like(norms), where=norms > 0)
+            weights = sp.diags(inverse_norms.astype(np.float32)) @ counts @ sp.diags(idf.astype(np.float32))
+
+            self.counts, self.job_ids, self.alive, self.idf = counts, job_ids, alive, idf
+            self.weights = weights.tocsc()
+            self.salary_min = np.concatenate([self.salary_min, [job[2] for job in pending]])
+            self.salary_max = np.concatenate([self.salary_max, [job[3] for job in pending]])
+            for name in PREFERENCE_BOOSTS:
+                self.preferences[name] = np.concatenate([
+                    self.preferences[name], np.array([job[4][name] for job in pending], dtype=np.int32)])
+
+    def query_vector(self, skills, interests=()):
+        query = np.zeros(len(self.idf))
+        for weight, phrases in ((1.0, skills), (UPSKILLING_WEIGHT, interests)):
+            for term in tokenize(list(phrases or [])):
+                column = self.term_columns.get(term)
+                if column is not None and column < len(query):
+                    query[column] = max(query[column], weight)
+        return query * self.idf
+
+    def score(self, user):
+        """Relevance of every job to a user; -inf for jobs excluded by salary or replaced by a re-import."""
+        personal = user["user_personal"]
+        preferences = user["user_job_preferences"]
+        with self.lock:
+            weights, alive = self.weights, self.alive
+            columns = dict(self.preferences)
+            salary_min, salary_max = self.salary_min, self.salary_max
+            wanted = {
+                "location": [self.codes["location"].get(personal.get("preferred_location"), -1)],
+                "work_type": [self.codes["work_type"].get(personal.get("work_type"), -1)],
+                "role": [self.codes["role"].get(role, -1) for role in preferences.get("preferred_roles") or []],
+                "sector": [self.codes["sector"].get(personal.get("preferred_industry"), -1)],
+            }
+            query = self.query_vector(personal.get("skills"), preferences.get("upskilling_interest"))
+
+        scores = np.zeros(weights.shape[0])
+        terms = np.flatnonzero(query)
+        if len(terms):
+            scores += weights[:, terms] @ (query[terms] / np.linalg.norm(query))
+        for name, boost in PREFERENCE_BOOSTS.items():
+            codes = [code for code in wanted[name] if code >= 0]
+            if codes:
+                matches = columns[name] == codes[0]
+                for code in codes[1:]:
+                    matches |= columns[name] == code
+                np.add(scores, boost, out=scores, where=matches)
+
+        # Salary range must overlap the user's preferred range; jobs without parsed salaries are kept
+        salary = preferences.get("preferred_salary_range") or {}
+        with np.errstate(invalid="ignore"):
+            excluded = ~alive
+            if salary.get("max") is not None:
+                excluded |= salary_min > salary["max"]
+            if salary.get("min") is not None:
+                excluded |= salary_max < salary["min"]
+        scores[excluded] = -np.inf
+        return scores
+
+    def top_jobs(self, user, limit=20, after=None):
+        """
+        Best (job_id, score) pairs for a user among the jobs scoring above zero, highest first
+        with ties by Job Id. `after` is the (score, job_id) of the previous page's last job.
+        """
+        self.refresh()
+        scores = self.score(user)
+        # A job must match at least one skill or preference to be relevant at all
+        scores[scores <= 0] = -np.inf
+        job_ids = self.job_ids[:len(scores)]
+        if after is not None:
+            after_score, after_job_id = after
+            scores[(scores > after_score) | ((scores == after_score) & (job_ids <= after_job_id))] = -np.inf
+        # Partial selection, keeping every job tied with the limit-th score so ties order by Job Id
+        threshold = -np.partition(-scores, limit - 1)[limit - 1] if limit < len(scores) else -np.inf
+        candidates = np.flatnonzero(scores >= threshold if np.isfinite(threshold) else np.isfinite(scores))
+        order = np.lexsort((job_ids[candidates], -scores[candidates]))[:limit]
+        return [(int(job_ids[candidates[i]]), float(scores[candidates[i]])) for i in order]
+
+    def stats(self):
+        return {"jobs": int(self.alive.sum()), "terms": len(self.term_columns), "non_zeros": self.counts.nnz,
+                "pending": len(self.pending)}
+
+
+class RelevanceScorer:
+    """SkillMatrix built from the jobs collection on first use and caught up when the data version changes."""
+    def __init__(self, jobs_collection, version_source=None, version_check_seconds=VERSION_CHECK_SECONDS):
+        self.jobs = jobs_collection
+        self.version_source = version_source
+        self.version_check_seconds = version_check_seconds
+        self.lock = threading.Lock()
+        self.matrix = None
+        self.version = None
+        self.version_checked_at = 0.0
+
+    def ensure_matrix(self):
+        with self.lock:
+            if self.matrix is None or time.monotonic() - self.version_checked_at >= self.version_check_seconds:
+                self.version_checked_at = time.monotonic()
+                version = self.read_version()
+                if self.matrix is None or version != self.version:
+                    matrix = self.matrix if self.matrix is not None else SkillMatrix()
+                    added = index_new_jobs(matrix, self.jobs, projection=SCORING_PROJECTION)
+                    matrix.refresh()
+                    if self.matrix is None:
+                        print(f"Built skill matrix from {added} jobs: {matrix.stats()}")
+                    self.matrix = matrix
+                    self.version = version
+            return self.matrix
+
+    def read_version(self):
+        if self.version_source is None:
+            return None
+        try:
+            return self.version_source()
+        except Exception as e:
+            print(f"Error reading skill matrix data version: {e}")
+            return self.version
+
+    def top_jobs(self, user, limit=20, after=None):
+        return self.ensure_matrix().top_jobs(user, limit, after)
+
+    def stats(self):
+        return self.matrix.stats() if self.matrix is not None else {"loaded": False}
@@ -0,0 +1,60 @@
+// "Load more" buttons under the job tables. Each button holds the JSON API URL of its
+// list (/api/jobs/*), the cursor of the next page, the table body to append to and the
+// action shown on each row ("save" or "remove").
+
+document.addEventListener('DOMContentLoaded', () => {
+
+    function jobRow(job, columns, action) {
+        const row = document.createElement('tr');
+        columns.forEach(column => {
+            row.insertCell().textContent = job[column] ?? '';
+        });
+        const cell = row.insertCell();
+        if (action === 'remove') {
+            const link = document.createElement('a');
+            link.href = `/remove_job/${job['Job Id']}`;
+            link.className = 'btn red lighten-1';
+            link.textContent = 'X';
+            cell.appendChild(link);
+        } else {
+            const button = document.createElement('button');
+            button.className = 'btn green save-btn';
+            button.dataset.jobId = job['Job Id'];
+            button.textContent = 'Save';
+            cell.appendChild(button);
+        }
+        return row;
+    }
+
+    document.querySelectorAll('.load-more').forEach(button => {
+        button.addEventListener('click', () => {
+            const url = new URL(button.dataset.url, window.location.origin);
+            url.searchParams.set('cursor', button.dataset.cursor);
+            button.disabled = true;
+
+            fetch(url)
+                .then(response => response.json())
+                .then(data => {
+                    if (data.error) {
+                        alert('Failed to load more jobs. Please try again.');
+                        button.disabled = false;
+                        return;
+                    }
+                    const body = document.getElementById(button.dataset.target);
+                    const columns = button.dataset.columns.split(',');
+                    data.jobs.forEach(job => body.appendChild(jobRow(job, columns, button.dataset.action)));
+
+                    if (data.next_cursor) {
+                        button.dataset.cursor = data.next_cursor;
+                        button.disabled = false;
+                    } else {
+                        button.remove();  // Last page
+                    }
+                })
+                .catch(error => {
+                    console.error('Error:', error);
+                    button.disabled = false;
+                });
+        });
+    });
+});
@@ -0,0 +1,182 @@
+"""
+In-memory prefix index behind /api/suggest (search box typeahead).
+
+Suggestions are job titles, roles, skills (split as job_fields.clean_and_split_skills
+does) and company names, weighted by the number of jobs they occur in. Each
+suggestion is reachable from the start of any of its words, so "sci" suggests
+"Data Scientist".
+
+Layout: suggestions are numbered by descending weight, so the best matches for a
+prefix are simply its smallest suggestion numbers. Every (word-start suffix,
+number) pair goes into one sorted list; a prefix query is two bisections plus
+the smallest numbers in that range. For prefixes of up to PRECOMPUTED_PREFIX_LENGTH
+characters, whose ranges are large, the top results are precomputed.
+
+Memory is bounded: only the MAX_SUGGESTIONS heaviest suggestions are indexed, and
+the frequency table feeding them is pruned to MAX_TRACKED entries. Jobs added
+with add_jobs() update the frequencies, and the sorted arrays are rebuilt from
+them (no database scan) before the next query. Suggester keeps the index current
+like the BM25 search backend, from the jobs inserted since the last indexed _id.
+"""
+from bisect import bisect_left
+import re
+import threading
+import time
+import numpy as np
+from job_fields import clean_and_split_skills
+from result_cache import VERSION_CHECK_SECONDS
+from search_backends import index_new_jobs
+
+# Most suggestions kept in the index
+MAX_SUGGESTIONS = 50000
+
+# Most distinct values counted; the least frequent are dropped beyond this
+MAX_TRACKED = 4 * MAX_SUGGESTIONS
+
+# Prefixes up to this length get their top results precomputed
+PRECOMPUTED_PREFIX_LENGTH = 2
+
+# Most suggestions returned (and precomputed) per prefix
+MAX_RESULTS = 10
+
+SUGGEST_PROJECTION = {"Job Title": 1, "Role": 1, "skills": 1, "Company": 1}
+
+
+def normalize(text):
+    return re.sub(r"\s+", " ", text).strip().lower()
+
+
+def job_suggestions(job):
+    """(text, kind) pairs a job contributes, each distinct value once."""
+    values = {}
+    for field, kind in (("Job Title", "title"), ("Role", "role"), ("Company", "company")):
+        if isinstance(job.get(field), str) and job[field].strip():
+            values.setdefault(normalize(job[field]), (job[field].strip(), kind))
+    for skill in clean_and_split_skills(job.get("skills")):
+        values.setdefault(normalize(skill), (skill, "skill"))
+    return values
+
+
+class SuggestIndex:
+    def __init__(self, max_suggestions=MAX_SUGGESTIONS, max_tracked=MAX_TRACKED):
+        self.max_suggestions = max_suggestions
+        self.max_tracked = max_tracked
+        self.lock = threading.Lock()
+        # normalized text -> [weight, display text, kind]
+        self.counts = {}
+        # Built by rebuild()
+        self.suggestions = []
+        self.keys = []
+        self.key_suggestions = np.array([], dtype=np.int32)
+        self.precomputed = {}
+        self.dirty = False
+        # Stored with the index, e.g. the last MongoDB _id indexed
+        self.meta = {}
+
+    def add_jobs(self, jobs):
+        """Count the suggestions of new jobs; the arrays are rebuilt on the next query. Returns the number added."""
+        added = 0
+        with self.lock:
+            for job in jobs:
+                for key, (text, kind) in job_suggestions(job).items():
+                    entry = self.counts.get(key)
+                    if entry is None:
+                        self.counts[key] = [1, text, kind]
+                    else:
+                        entry[0] += 1
+                added += 1
+            if len(self.counts) > self.max_tracked:
+                kept = sorted(self.counts.items(), key=lambda item: -item[1][0])[:self.max_tracked]
+                self.counts = dict(kept)
+            self.dirty = True
+        return added
+
+    def rebuild(self):
+        ranked = sorted(self.counts.items(), key=lambda item: (-item[1][0], item[0]))[:self.max_suggestions]
+        pairs = []
+        for number, (key, _) in enumerate(ranked):
+            for match in re.finditer(r"\S+", key):
+                pairs.append((key[match.start():], number))
+        pairs.sort()
+
+        keys = [key for key, _ in pairs]
+        key_suggestions = np.array([number for _, number in pairs], dtype=np.int32)
+        precomputed = {}
+        for length in range(1, PRECOMPUTED_PREFIX_LENGTH + 1):
+            for prefix in {key[:length] for key in keys if len(key) >= length}:
+                precomputed[prefix] = self.top_numbers(keys, key_suggestions, prefix)
+
+        # Swap in the new arrays at once for concurrent readers
+        self.suggestions = [{"text": entry[1], "kind": entry[2], "weight": entry[0]} for _, entry in ranked]
+        self.keys, self.key_suggestions, self.precomputed = keys, key_suggestions, precomputed
+
+    @staticmethod
+    def top_numbers(keys, key_suggestions, prefix, limit=MAX_RESULTS):
+        start = bisect_left(keys, prefix)
+        end = bisect_left(keys, prefix + "\uffff", start)
+        return np.unique(key_suggestions[start:end])[:limit].tolist()
+
+    def suggest(self, prefix, limit=MAX_RESULTS):
+        """Best suggestions for a prefix, heaviest first."""
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+        if self.dirty:
+            with self.lock:
+                if self.dirty:
+                    self.rebuild()
+                    self.dirty = False
+        suggestions, keys, key_suggestions = self.suggestions, self.keys, self.key_suggestions
+        numbers = self.precomputed.get(prefix) if limit <= MAX_RESULTS else None
+        if numbers is None:
+            numbers = self.top_numbers(keys, key_suggestions, prefix, limit)
+        return [suggestions[number] for number in numbers[:limit]]
+
+    def stats(self):
+        return {
+            "suggestions": len(self.suggestions),
+            "keys": len(self.keys),
+            "tracked": len(self.counts),
+            "precomputed_prefixes": len(self.precomputed),
+        }
+
+
+class Suggester:
+    """SuggestIndex built from the jobs collection on first use and caught up when the data version changes."""
+    def __init__(self, jobs_collection, version_source=None, version_check_seconds=VERSION_CHECK_SECONDS):
+        self.jobs = jobs_collection
+        self.version_source = version_source
+        self.version_check_seconds = version_check_seconds
+        self.lock = threading.Lock()
+        self.index = None
+        self.version = None
+        self.version_checked_at = 0.0
+
+    def ensure_index(self):
+        with self.lock:
+            if self.index is None or time.monotonic() - self.version_checked_at >= self.version_check_seconds:
+                self.version_checked_at = time.monotonic()
+                version = self.read_version()
+                if self.index is None or version != self.version:
+                    index = self.index or SuggestIndex()
+                    added = index_new_jobs(index, self.jobs, projection=SUGGEST_PROJECTION)
+                    if self.index is None:
+                        print(f"Built suggestion index from {added} jobs: {index.stats()}")
+                    self.index = index
+                    self.version = version
+            return self.index
+
+    def read_version(self):
+        if self.version_source is None:
+            return None
+        try:
+            return self.version_source()
+        except Exception as e:
+            print(f"Error reading suggestion index data version: {e}")
+            return self.version
+
+    def suggest(self, prefix, limit=MAX_RESULTS):
+        return self.ensure_index().suggest(prefix, limit)
+
+    def stats(self):
+        return self.index.stats() if self.index is not None else {"loaded": False}
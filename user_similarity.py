@@ -0,0 +1,161 @@
+"""
+Skill-overlap user similarity for the "Recommended Jobs" list.
+
+Each user's top-K most similar users (Jaccard similarity of their lowercased skill
+sets) are materialised in Neo4j as (:User)-[:SIMILAR_USER {score}]->(:User) edges,
+so main() reads recommendations with one indexed lookup instead of comparing the
+user against every other User node. Only users with saved jobs are kept as
+neighbours, because recommendations are the neighbours' SAVED jobs.
+
+Run this module to rebuild every user's neighbours; the app keeps them current
+with refresh_user() when a profile changes or a user saves their first job.
+"""
+from collections import defaultdict
+import heapq
+from pymongo import MongoClient
+from neo4j_client import Neo4jClient
+
+# Number of SIMILAR_USER edges kept per user
+TOP_K = 20
+
+# Number of users whose edges are written per UNWIND query
+WRITE_BATCH_SIZE = 500
+
+USER_PROJECTION = {"user.user_id": 1, "user_personal.skills": 1, "user_job_preferences.saved_jobs": 1}
+
+
+def normalise_skills(skills):
+    return {skill.strip().lower() for skill in skills or [] if isinstance(skill, str) and skill.strip()}
+
+
+def jaccard(skills_a, skills_b, overlap=None):
+    if overlap is None:
+        overlap = len(skills_a & skills_b)
+    union = len(skills_a) + len(skills_b) - overlap
+    return overlap / union if union else 0.0
+
+
+def user_record(user):
+    """(user_id, skill set, has saved jobs) for a user document."""
+    return (
+        user["user"]["user_id"],
+        normalise_skills(user.get("user_personal", {}).get("skills")),
+        bool(user.get("user_job_preferences", {}).get("saved_jobs")),
+    )
+
+
+def compute_all_neighbours(users, k=TOP_K):
+    """
+    Top-K neighbours for every user. Overlaps are accumulated through a
+    skill -> users inverted index, so only pairs sharing a skill are scored.
+    Returns {user_id: [{"user_id": ..., "score": ...}, ...]}.
+    """
+    records = [user_record(user) for user in users]
+    skills_by_user = {user_id: skills for user_id, skills, _ in records}
+
+    index = defaultdict(list)
+    for user_id, skills, has_saved in records:
+        if has_saved:
+            for skill in skills:
+                index[skill].append(user_id)
+
+    neighbours = {}
+    for user_id, skills, _ in records:
+        overlaps = defaultdict(int)
+        for skill in skills:
+            for other_id in index[skill]:
+                if other_id != user_id:
+                    overlaps[other_id] += 1
+        scored = ((jaccard(skills, skills_by_user[other_id], overlap), other_id)
+                  for other_id, overlap in overlaps.items())
+        neighbours[user_id] = [{"user_id": other_id, "score": score}
+                               for score, other_id in heapq.nlargest(k, scored)]
+    return neighbours
+
+
+def write_neighbours(neo4j, neighbours):
+    """Replace the outgoing SIMILAR_USER edges of the given users."""
+    rows = [{"user_id": user_id, "neighbours": items} for user_id, items in neighbours.items()]
+    for start in range(0, len(rows), WRITE_BATCH_SIZE):
+        neo4j.write("""
+            UNWIND $rows AS row
+            MERGE (u:User {user_id: row.user_id})
+            WITH u, row
+            OPTIONAL MATCH (u)-[old:SIMILAR_USER]->()
+            DELETE old
+            WITH DISTINCT u, row
+            UNWIND row.neighbours AS neighbour
+            MATCH (v:User {user_id: neighbour.user_id})
+            MERGE (u)-[r:SIMILAR_USER]->(v)
+            SET r.score = neighbour.score
+        """, rows=rows[start:start + WRITE_BATCH_SIZE], label="write_similar_users")
+
+
+def rebuild_all(users_collection, neo4j, k=TOP_K):
+    """Recompute and store the neighbours of every user."""
+    neighbours = compute_all_neighbours(users_collection.find({}, USER_PROJECTION), k)
+    write_neighbours(neo4j, neighbours)
+    print(f"Stored SIMILAR_USER neighbours for {len(neighbours)} users.")
+    return neighbours
+
+
+def refresh_user(users_collection, neo4j, user_id, k=TOP_K):
+    """
+    Incrementally refresh one user after their skills or saved jobs change:
+    recompute their own neighbours, then insert them into (or drop them from) the
+    neighbour lists of users sharing a skill, keeping each list at the top K.
+    A user dropped from a list is not back-filled until the next full rebuild.
+    """
+    user = users_collection.find_one({"user.user_id": user_id}, USER_PROJECTION)
+    if not user:
+        return
+    _, skills, has_saved = user_record(user)
+    raw_skills = user.get("user_personal", {}).get("skills") or []
+
+    candidates = users_collection.find({
+        "user.user_id": {"$ne": user_id},
+        "user_personal.skills": {"$in": list(set(raw_skills) | skills)}
+    }, USER_PROJECTION)
+
+    own = []
+    incoming = []
+    for candidate in candidates:
+        other_id, other_skills, other_has_saved = user_record(candidate)
+        score = jaccard(skills, other_skills)
+        if score <= 0:
+            continue
+        if other_has_saved:
+            own.append((score, other_id))
+        incoming.append({"user_id": other_id, "score": score})
+
+    write_neighbours(neo4j, {
+        user_id: [{"user_id": other_id, "score": score} for score, other_id in heapq.nlargest(k, own)]
+    })
+
+    neo4j.write("""
+        MATCH (:User)-[r:SIMILAR_USER]->(:User {user_id: $user_id})
+        DELETE r
+    """, user_id=user_id, label="drop_incoming_similar_users")
+    if has_saved and incoming:
+        neo4j.write("""
+            MATCH (u:User {user_id: $user_id})
+            UNWIND $rows AS row
+            MATCH (v:User {user_id: row.user_id})
+            MERGE (v)-[r:SIMILAR_USER]->(u)
+            SET r.score = row.score
+            WITH DISTINCT v
+            MATCH (v)-[r:SIMILAR_USER]->()
+            WITH v, r ORDER BY r.score DESC
+            WITH v, collect(r) AS rels
+            FOREACH (extra IN rels[$k..] | DELETE extra)
+        """, user_id=user_id, rows=incoming, k=k, label="insert_incoming_similar_users")
+
+
+if __name__ == "__main__":
+    from config import ATLAS_URI, DB_NAME
+
+    client = MongoClient(ATLAS_URI)
+    neo4j = Neo4jClient.from_config()
+    rebuild_all(client[DB_NAME]['users'], neo4j)
+    neo4j.close()
+    client.close()